@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+"""
+Benchmark of the LP oracle backends on a set (default: example_present_ddt).
+
+Answers the same random queries (sets of 1..4 exclude points)
+with each solver, plain and incremental, and checks that they agree.
+"""
+
+import argparse
+import random
+import time
+
+from monolearn.SparseSet import SparseSet
+
+from optimodel.constraint_pool import ConstraintPool
+from optimodel.inequality import Inequality
+from optimodel.lp_oracle import LPbasedOracle
+from optimodel.tool.set_files import read_set, SetType, TypeGood
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip())
+    parser.add_argument(
+        "fileprefix", nargs="?", default="example_present_ddt/",
+    )
+    parser.add_argument(
+        "--solvers", default="swiglpk,native",
+    )
+    parser.add_argument(
+        "--queries", type=int, default=2000,
+    )
+    parser.add_argument(
+        "--max-size", type=int, default=4,
+    )
+    parser.add_argument(
+        "--seed", type=int, default=1,
+    )
+    args = parser.parse_args()
+
+    include = read_set(args.fileprefix + "include")
+    exclude = read_set(args.fileprefix + "exclude")
+    typ = SetType.read_from_file(args.fileprefix + "type")
+    n = exclude.n
+    pool = ConstraintPool(
+        include=include,
+        exclude=exclude,
+        direction=(-1,)*n if typ.type_good == TypeGood.LOWER else None,
+        is_upper=typ.type_good != TypeGood.EXPLICIT,
+        constraint_class=Inequality,
+    )
+    print(
+        f"n {n}, include {len(pool.include)}, exclude {len(pool.exclude)}"
+    )
+
+    rnd = random.Random(args.seed)
+    queries = [
+        SparseSet(rnd.sample(
+            range(len(pool.exclude)), rnd.randint(1, args.max_size)
+        ))
+        for _ in range(args.queries)
+    ]
+
+    answers = None
+    for solver in args.solvers.split(","):
+        for incremental in (False, True):
+            oracle = LPbasedOracle(
+                pool, solver=solver, incremental=incremental,
+            )
+            t0 = time.time()
+            res = [oracle._query(q) for q in queries]
+            elapsed = time.time() - t0
+
+            feasible = [ok for ok, _ in res]
+            if answers is None:
+                answers = feasible
+            assert feasible == answers, f"{solver}: different answers"
+            mode = "incremental" if incremental else "plain"
+            print(
+                f"{solver:>10s} {mode:>11s}:"
+                f" {elapsed:7.3f}s"
+                f" {elapsed / len(queries) * 1e6:8.1f} us/query"
+                f" ({sum(feasible)}/{len(queries)} feasible)"
+            )
+
+
+if __name__ == '__main__':
+    main()
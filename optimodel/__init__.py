@@ -1,4 +1,5 @@
 from .constraint_pool import ConstraintPool
 from .tool.set_files import TypeGood, SetType
-from .inequality import Inequality
-from .clause import OrClause, AndClause
+from .packed_points import PackedPoints
+from .inequality import Inequality, InequalitySystem
+from .clause import OrClause, AndClause, ClauseSystem
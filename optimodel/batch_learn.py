@@ -0,0 +1,62 @@
+import logging
+
+from monolearn import LevelLearn
+from monolearn import Modules as LearnModules
+from monolearn.utils import TimeStat
+
+
+class BatchLevelLearn(LevelLearn):
+    """LevelLearn sending all candidates of a level to the oracle
+    in one batch (oracle.query_many, e.g. ParallelLPOracle),
+    the level is then processed by LevelLearn from the oracle's cache.
+    """
+    log = logging.getLogger(f"{__name__}")
+
+    @TimeStat.log
+    def learn_lower(self, up_to):
+        cache = self.oracle._lower_cache
+        if cache.range is None:
+            super().learn_lower(up_to=0)
+
+        while cache.has(self.vec_empty) and cache.range[1] < up_to:
+            l = cache.range[1] + 1
+            to_check = {}
+            for prev in cache.iter_weight(l - 1):
+                for up in prev.neibs_up(n=self.N):
+                    to_check[up] = to_check.get(up, 0) + 1
+            batch = [vec for vec, cnt in to_check.items() if cnt == l]
+            if not batch:
+                break
+
+            self.query_batch(batch)
+            super().learn_lower(up_to=l)
+
+    @TimeStat.log
+    def learn_upper(self, down_to):
+        cache = self.oracle._upper_cache
+        if cache.range is None:
+            super().learn_upper(down_to=self.N)
+
+        while cache.has(self.vec_full) and cache.range[0] > down_to:
+            l = cache.range[0] - 1
+            to_check = {}
+            for prev in cache.iter_weight(l + 1):
+                for down in prev.neibs_down():
+                    to_check[down] = to_check.get(down, 0) + 1
+            batch = [vec for vec, cnt in to_check.items() if cnt == self.N - l]
+            if not batch:
+                break
+
+            self.query_batch(batch)
+            super().learn_upper(down_to=l)
+
+    @TimeStat.log
+    def query_batch(self, vecs):
+        self.log.info(f"querying batch of {len(vecs)} vectors")
+        query_many = getattr(self.oracle, "query_many", None)
+        if query_many is None:
+            return [self.oracle(vec) for vec in vecs]
+        return query_many(vecs)
+
+
+LearnModules[BatchLevelLearn.__name__] = BatchLevelLearn
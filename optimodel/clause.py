@@ -1,8 +1,81 @@
+import numpy as np
+
 from binteger import Bin
 from subsets import DenseSet
 
+from optimodel.packed_points import as_codes, points_dimension
+
+
+def pack_point(pt):
+    """Integer code of a binary point (Bin(pt).int)."""
+    if isinstance(pt, Bin):
+        return pt.int
+    x = 0
+    for v in pt:
+        x = (x << 1) | int(v)
+    return x
+
+
+class Clause(tuple):
+    """Common part of OrClause/AndClause.
+
+    A clause over n variables is compiled (once per n) into
+    a pair of integers (mask, value) on packed points
+    (first variable is the most significant bit, as in Bin):
+    x satisfies the cube of the literals iff x & mask == value.
+    """
+
+    IS_OR = NotImplemented
+
+    def compile(self, n):
+        try:
+            return self._compiled[n]
+        except AttributeError:
+            self._compiled = {}
+        except KeyError:
+            pass
+
+        mask = value = 0
+        for i in self:
+            if not 1 <= abs(i) <= n:
+                raise ValueError(f"literal {i} out of range for n={n}")
+            bit = 1 << (n - abs(i))  # Clause is 1-based so no n-1
+            # literal true (for And) / false (for Or) at this bit
+            if (i > 0) ^ self.IS_OR:
+                if mask & bit and not value & bit:
+                    # contradicting literals: empty cube
+                    mask, value = 0, 1
+                    break
+                value |= bit
+            elif value & bit:
+                mask, value = 0, 1
+                break
+            mask |= bit
+
+        self._compiled[n] = mask, value
+        return mask, value
+
+    def satisfy(self, pt):
+        n = len(pt)
+        mask, value = self.compile(n)
+        return ((pack_point(pt) & mask) == value) ^ self.IS_OR
+
+    def satisfy_many(self, points, n=None):
+        """Vectorized satisfy: boolean vector over points
+        (PackedPoints, (N, n) matrix or packed codes with given n)."""
+        if n is None:
+            n = points_dimension(points)
+        return self.stack((self,), n=n).satisfy_all(points)
+
+    def violated_mask(self, points, n=None):
+        return ~self.satisfy_many(points, n=n)
+
+    @classmethod
+    def stack(cls, clauses, n):
+        return ClauseSystem(clauses, n=n)
+
 
-class OrClause(tuple):
+class OrClause(Clause):
     """Disjunction (cube complement)
 
     Format:
@@ -10,13 +83,7 @@ class OrClause(tuple):
     (x[4-1] v ~x[7-1] v x[11-1] & ...)
     """
 
-    def satisfy(self, pt):
-        for i in self:
-            if i > 0 and pt[abs(i)-1] == 1:
-                return True
-            if i < 0 and pt[abs(i)-1] == 0:
-                return True
-        return False
+    IS_OR = True
 
     def solutions(self, n) -> DenseSet:
         d = DenseSet(n)
@@ -34,7 +101,7 @@ class OrClause(tuple):
         return AndClause(-v for v in self)
 
 
-class AndClause(tuple):
+class AndClause(Clause):
     """Conjunction (cube).
 
     Format:
@@ -42,13 +109,7 @@ class AndClause(tuple):
     (x[4-1] & ~x[7-1] & x[11-1] & ...)
     """
 
-    def satisfy(self, pt):
-        for i in self:
-            if i > 0 and pt[abs(i)-1] != 1:
-                return False
-            if i < 0 and pt[abs(i)-1] != 0:
-                return False
-        return True
+    IS_OR = False
 
     def solutions(self, n) -> DenseSet:
         d = DenseSet(n)
@@ -67,3 +128,65 @@ class AndClause(tuple):
 
     def __invert__(self):
         return OrClause(-v for v in self)
+
+
+class ClauseSystem:
+    """Stacked clauses (a CNF or a DNF) evaluated against
+    many packed points in one call.
+
+    CNF (OrClause's) is satisfied by satisfy_all,
+    DNF (AndClause's) by satisfy_any.
+    """
+    CHUNK = 2**24  # max. matrix entries per chunk
+
+    def __init__(self, clauses, n):
+        self.clauses = list(clauses)
+        self.n = int(n)
+
+        dtype = np.uint64 if self.n <= 64 else object
+        compiled = [c.compile(self.n) for c in self.clauses]
+        self.masks = np.array([m for m, v in compiled], dtype=dtype)
+        self.values = np.array([v for m, v in compiled], dtype=dtype)
+        self.is_or = np.array([c.IS_OR for c in self.clauses], dtype=bool)
+
+        self.masks = self.masks.reshape(-1, 1)
+        self.values = self.values.reshape(-1, 1)
+        self.is_or = self.is_or.reshape(-1, 1)
+
+    def __len__(self):
+        return len(self.clauses)
+
+    def _chunks(self, points):
+        codes = as_codes(points, n=self.n)
+        step = max(1, self.CHUNK // max(1, len(self.clauses)))
+        for start in range(0, len(codes), step):
+            yield codes[start:start+step].astype(self.masks.dtype)
+
+    def _satisfy(self, codes):
+        return ((codes & self.masks) == self.values) ^ self.is_or
+
+    def satisfy_matrix(self, points):
+        """(m, N) boolean matrix: i-th clause satisfied by j-th point."""
+        return np.concatenate(
+            [self._satisfy(chunk) for chunk in self._chunks(points)]
+            or [np.zeros((len(self.clauses), 0), dtype=bool)],
+            axis=1,
+        )
+
+    def satisfy_all(self, points):
+        """(N,) boolean vector: point satisfies all clauses (CNF)."""
+        return np.concatenate([
+            self._satisfy(chunk).all(axis=0)
+            for chunk in self._chunks(points)
+        ] or [np.ones(0, dtype=bool)])
+
+    def satisfy_any(self, points):
+        """(N,) boolean vector: point satisfies some clause (DNF)."""
+        return np.concatenate([
+            self._satisfy(chunk).any(axis=0)
+            for chunk in self._chunks(points)
+        ] or [np.ones(0, dtype=bool)])
+
+    def violated_any(self, points):
+        """(N,) boolean vector: point violates some clause."""
+        return ~self.satisfy_all(points)
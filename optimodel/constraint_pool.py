@@ -1,4 +1,6 @@
 import os
+import json
+import hashlib
 import logging
 import subprocess
 from random import randrange
@@ -11,6 +13,8 @@ from monolearn import LowerSetLearn, ExtraPrec_LowerSet
 from monolearn.utils import dictify_add_class
 
 from optisolveapi.milp import MILP
+
+from optimodel.packed_points import PackedPoints
 #from optisolveapi.milp.symbase import LPwriter
 
 
@@ -25,35 +29,9 @@ Result = namedtuple(
 )
 
 
-def hash_sorted_points(lst):
-    mask = 2**128-1
-    h = 0xc1b8110707ac03c72f523637091a63d3
-    for pt in lst:
-        for c in pt:
-            h = ((h + c) * 0x3dca7017) ^ h
-            h &= mask
-            h ^= h >> 17
-            h &= mask
-        h ^= h >> 27
-    return "%032x" % h
-
-
-NotGiven = object()
-
-
 class ConstraintPool:
     log = logging.getLogger(f"{__name__}:ConstraintPool")
 
-    def reorient_point(self, pt: tuple[int], direction: tuple[int] = NotGiven):
-        if direction is NotGiven:
-            direction = self.direction
-        if direction is None:
-            return pt
-        return tuple(
-            1 - v if d == -1 else v
-            for v, d in zip(pt, direction)
-        )
-
     def __init__(
         self,
         exclude: set[tuple[int]],
@@ -67,11 +45,10 @@ class ConstraintPool:
         output_prefix: str = None,
         constraint_class: type = None,
     ):
-        for v in exclude:
-            self.n = len(v)
-            break
-        else:
+        exclude = PackedPoints.coerce(exclude)
+        if not exclude:
             raise RuntimeError("no exclude points? nothing to do")
+        self.n = exclude.n
 
         self.direction = direction
         self.is_upper = is_upper
@@ -85,20 +62,24 @@ class ConstraintPool:
         else:
             self.log.info("no reorienting")
 
-        # copy to new sets to ensure it's not modified externally
-        self.exclude = sorted(self.reorient_point(v, direction) for v in exclude)
-        self.include = (sorted(self.reorient_point(v, direction) for v in include)
-                        if include is not None else None)
+        # packed storage, sorted and reoriented
+        # (new objects, so not modified externally)
+        self.exclude = exclude.reoriented(direction)
+        self.include = (
+            PackedPoints.coerce(include, n=self.n).reoriented(direction)
+            if include is not None else None
+        )
 
-        hi = hash_sorted_points(self.include) if self.include is not None else -1
-        he = hash_sorted_points(self.exclude)
+        hi = self.include.digest() if self.include is not None else -1
+        he = self.exclude.digest()
 
         li = len(self.include) if self.include is not None else "(not given)"
         self.log.info(f"exclude: {len(self.exclude):11} points, hash {he}")
         self.log.info(f"include: {li:11} points, hash {hi}")
 
-        self.i2exc = sorted(self.exclude)
-        self.exc2i = {p: i for i, p in enumerate(self.i2exc)}
+        # tuple-based views
+        self.i2exc = self.exclude
+        self.exc2i = self.exclude.index_map
 
         self.N = len(self.exclude)
 
@@ -117,6 +98,7 @@ class ConstraintPool:
             ep = None
         self.use_point_prec = use_point_prec
 
+        self.constraint_class = constraint_class
         dictify_add_class(constraint_class)
         self.system = LowerSetLearn(
             n=self.N,
@@ -133,8 +115,30 @@ class ConstraintPool:
         self.best_subset_size_ub = 1111111111111111111  # inf
         self.best_subset_size_lb = 1  # inf
         self.best_subset = None
+        self.best_subset_optimal = False
+        self.best_subset_source = None
 
         self.output_prefix = output_prefix
+        # full check of reported subsets (safety net for oracle checks)
+        self.verify_subsets = True
+        # points no constraint may remove, checked instead of include
+        # when the pool has none (e.g. the other set in optimodel.boolean)
+        self.verify_include = None
+
+    def fingerprint(self, **tags) -> str:
+        """Hash of the instance: point sets (as stored, i.e. reoriented),
+        orientation, constraint class and extra tags
+        (e.g. tool options affecting the result)."""
+        data = dict(
+            exclude=self.exclude.digest(),
+            include=self.include.digest() if self.include is not None else None,
+            direction=self.direction,
+            is_upper=self.is_upper,
+            constraint_class=getattr(self.constraint_class, "__name__", None),
+            tags=tags,
+        )
+        data = json.dumps(data, sort_keys=True, default=str)
+        return hashlib.blake2b(data.encode(), digest_size=16).hexdigest()
 
     def finalize(self):
         if self._constraints is not None:
@@ -173,17 +177,57 @@ class ConstraintPool:
             self.finalize()
         return self._constraints
 
-    def check_subset(self, fsets):
-        constrs = [
-            self.constraints[self.cons2i[fset]].cons_pool
-            for fset in fsets
-        ]
+    def verify_subset(self, constraints):
+        """Check final constraints against all points
+        (in the original orientation), vectorized.
 
-        if self.include:
-            for q in self.include:
-                assert all(cons.satisfy(q) for cons in constrs)
-        for q in self.exclude:
-            assert any(not cons.satisfy(q) for cons in constrs)
+        Constraints are a CNF-like system (inequalities, OrClause's):
+        include points satisfy all of them, each exclude point violates
+        some; or a DNF of AndClause cubes (optimodel.boolean --dnf,
+        where the pool's exclude are the points to select):
+        each exclude point satisfies some cube, no include point does.
+        """
+        include = self.include
+        if include is None:
+            include = self.verify_include
+        exclude = self.exclude
+        if self.direction:
+            include = include.reoriented(self.direction) \
+                if include is not None else None
+            exclude = exclude.reoriented(self.direction)
+
+        is_dnf = bool(constraints) and all(
+            getattr(cons, "IS_OR", None) is False for cons in constraints
+        )
+        if is_dnf:
+            system = type(constraints[0]).stack(constraints, n=self.n)
+            ok_include = include is None \
+                or not system.satisfy_any(include).any()
+            ok_exclude = system.satisfy_any(exclude).all()
+        elif not hasattr(self.constraint_class, "stack"):
+            ok_include = include is None or all(
+                cons.satisfy(q)
+                for q in include.matrix.tolist() for cons in constraints
+            )
+            ok_exclude = all(
+                any(not cons.satisfy(q) for cons in constraints)
+                for q in exclude.matrix.tolist()
+            )
+        else:
+            system = self.constraint_class.stack(constraints, n=self.n)
+            ok_include = include is None or system.satisfy_all(include).all()
+            ok_exclude = system.violated_any(exclude).all()
+
+        if not ok_include:
+            raise RuntimeError("subset verification: include point removed")
+        if not ok_exclude:
+            raise RuntimeError("subset verification: exclude point kept")
+        self.log.info(
+            f"verified {len(constraints)} constraints"
+            f" against {len(exclude)} exclude"
+            f" and {len(include) if include is not None else 0} include"
+            " points" + (" (DNF)" if is_dnf else "")
+        )
 
     def write_subset_gecco(self, filename):
         assert filename.endswith(".gecco")
@@ -395,6 +439,8 @@ class ConstraintPool:
             f"got {len(constraints)} constraints"
             f"from {source} (optimal? {optimal})"
         )
+        if self.verify_subsets:
+            self.verify_subset(constraints)
 
         if not self.output_prefix:
             self.log.warning("output prefix not set, not writing")
@@ -407,12 +453,16 @@ class ConstraintPool:
         if len(constraints) < self.best_subset_size_ub:
             self.best_subset_size_ub = len(constraints)
             self.best_subset = constraints
+            self.best_subset_optimal = optimal
+            self.best_subset_source = source
         elif len(constraints) == self.best_subset_size_ub \
              and optimal \
              and not os.path.isfile(filename):
             # perhaps was not known that it's optimal, let's write down to .opt
             self.best_subset_size_ub = len(constraints)
             self.best_subset = constraints
+            self.best_subset_optimal = optimal
+            self.best_subset_source = source
         else:
             self.log.info(
                 "skipping sol with"
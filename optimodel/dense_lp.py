@@ -0,0 +1,331 @@
+"""
+Small dense LP feasibility solver in NumPy ("native" MILP backend).
+
+Meant for the LP oracle: few variables (n + 1 <= ~20),
+up to thousands of rows, many calls - the per-call overhead
+of an external solver dominates there.
+
+Feasibility of G w >= h (w free) is decided by the phase-1 LP
+    min t  s.t.  G w + t >= h,  t >= 0
+solved through its dual
+    max h.y  s.t.  G^T y = 0,  sum(y) <= 1,  y >= 0,
+which has only n + 1 equality rows and one column per row of G
+(revised simplex with an explicit dense basis inverse).
+The optimum is 0 iff the system is feasible,
+and then w is read off the simplex multipliers.
+"""
+
+from collections import namedtuple
+
+import numpy as np
+
+from optisolveapi.milp import MILP
+
+
+class DenseFeasibility:
+    """Revised simplex on the dual of the phase-1 LP of G w >= h.
+
+    Basis columns are numbered: 0..m-1 rows of G (y),
+    m the slack of sum(y) <= 1, m+1..m+d the artificial columns
+    of G^T y = 0 (fixed at zero, they only leave the basis),
+    then the ghost columns: rows removed since the starting basis
+    was optimal, penalized (big M) so that they leave the basis.
+    """
+    EPS = 1e-9
+    PIVOT_EPS = 1e-7  # smallest pivot element
+    BLAND_AFTER = 50  # degenerate pivots in a row before Bland's rule
+    GHOST_COST = 1e4
+
+    def __init__(self, G, h, ghosts=()):
+        self.G = np.asarray(G, dtype=np.float64)
+        self.h = np.asarray(h, dtype=np.float64)
+        self.m, self.d = m, d = self.G.shape
+        self.n_pivots = 0
+
+        ghosts = np.asarray(ghosts, dtype=np.float64).reshape(-1, d)
+        self.A = np.zeros((d + 1, m + 1 + d + len(ghosts)))
+        self.A[:d, :m] = self.G.T
+        self.A[d, :m + 1] = 1.0
+        self.A[:d, m + 1:m + 1 + d] = np.eye(d)
+        self.A[:d, m + 1 + d:] = ghosts.T
+        self.A[d, m + 1 + d:] = 1.0
+        self.costs = np.zeros(self.A.shape[1])
+        self.costs[:m] = -self.h
+        self.costs[m + 1 + d:] = self.GHOST_COST
+        self.is_art = np.zeros(self.A.shape[1], dtype=bool)
+        self.is_art[m + 1:m + 1 + d] = True
+        # columns which may enter: y and the slack
+        self.A_enter = np.ascontiguousarray(self.A[:, :m + 1])
+        self.costs_enter = self.costs[:m + 1]
+
+    def solve(self, basis=None):
+        """Returns w with G w >= h (up to EPS) or None if infeasible.
+
+        basis: starting basis (list of d + 1 columns) if still valid,
+        None entries are replaced by free artificial columns.
+        """
+        m, d = self.m, self.d
+        warm = basis is not None and self._set_basis(self._complete(basis))
+        if not warm:
+            self._set_basis(np.r_[m + 1:m + d + 1, m])
+
+        n_degenerate = 0
+        for _ in range(50 * (m + d + 1)):
+            pi = self.cost_basis @ self.Binv
+            # reduced costs of y and of the slack (artificials never enter)
+            reduced = self.costs_enter - pi @ self.A_enter
+            bland = n_degenerate >= self.BLAND_AFTER
+            if not bland:
+                q = int(reduced.argmin())
+                if reduced[q] >= -self.EPS:
+                    break
+            else:
+                cands = np.flatnonzero(reduced < -self.EPS)
+                if not len(cands):
+                    break
+                q = int(cands[0])
+
+            step = self._pivot(q, bland)
+            n_degenerate = 0 if step > self.EPS else n_degenerate + 1
+        else:
+            raise RuntimeError("dense LP: iteration limit reached")
+
+        if self.n_pivots:
+            # refresh the inverse to reduce accumulated rounding
+            self._set_basis(self.basis)
+        is_ghost = self.basis > m + d
+        if (self.xB[is_ghost] > self.EPS).any():
+            # penalty too small
+            assert warm
+            return self.solve()
+
+        pi = self.cost_basis @ self.Binv
+        # optimal value is -t
+        if self.cost_basis @ self.xB < -self.EPS:
+            return
+        w = -pi[:d]
+        assert (self.G @ w >= self.h - 1e-6).all(), \
+            "dense LP: numerical failure"
+        return w
+
+    def _complete(self, basis):
+        free = [
+            j for j in range(self.m + 1, self.m + 1 + self.d)
+            if j not in basis
+        ]
+        return np.array([free.pop() if j is None else j for j in basis])
+
+    def _set_basis(self, basis):
+        B = self.A[:, basis]
+        try:
+            Binv = np.linalg.inv(B)
+        except np.linalg.LinAlgError:
+            return False
+        if abs(Binv @ B - np.eye(self.d + 1)).max() > 1e-9:
+            return False
+        xB = Binv[:, self.d]  # B^-1 (0, ..., 0, 1)
+        is_art = self.is_art[basis]
+        if (xB < -self.EPS).any() or (abs(xB[is_art]) > self.EPS).any():
+            return False
+        self.basis = basis
+        self.Binv = Binv
+        self.xB = np.maximum(xB, 0.0)
+        self.cost_basis = self.costs[basis]
+        return True
+
+    def _pivot(self, q, bland=False):
+        alpha = self.Binv @ self.A[:, q]
+        abs_alpha = abs(alpha)
+        # artificials are fixed at zero: they leave at once
+        ratios = np.where(
+            self.is_art[self.basis],
+            np.where(abs_alpha > self.PIVOT_EPS, 0.0, np.inf),
+            np.where(
+                alpha > self.PIVOT_EPS,
+                self.xB / np.maximum(alpha, self.PIVOT_EPS),
+                np.inf,
+            ),
+        )
+        if bland:
+            # ties broken by the smallest column
+            r = np.lexsort((self.basis, ratios))[0]
+        else:
+            # ties broken by the largest pivot element
+            ties = ratios <= ratios.min() + self.EPS
+            r = np.where(ties, abs_alpha, -1.0).argmax()
+        step = ratios[r]
+        # sum(y) + s = 1 bounds every column
+        assert step < np.inf, "dense LP: unbounded dual"
+
+        self.n_pivots += 1
+        Binv = self.Binv
+        Binv[r] /= alpha[r]
+        alpha[r] = 0.0
+        Binv -= alpha[:, None] * Binv[r]
+        self.xB -= alpha * step
+        np.maximum(self.xB, 0.0, out=self.xB)
+        self.xB[r] = step
+        self.basis[r] = q
+        self.cost_basis[r] = self.costs[q]
+        return step
+
+
+@MILP.register("native")
+class DenseLP(MILP):
+    """Feasibility-only LP model with real variables (see DenseFeasibility).
+
+    Rows are kept in a dense matrix and can be switched on/off
+    (.set_active) which the incremental LP oracle uses;
+    the last optimal basis is the starting point of the next solve
+    (switched-off basic rows are pushed out of it as ghost columns).
+    """
+    VarInfo = namedtuple("VarInfo", ("name", "typ", "id"))
+
+    def __init__(self, maximization, solver):
+        super().__init__(maximization, solver)
+        assert maximization is None, "only feasibility is supported"
+        self.lbs = []
+        self.ubs = []
+
+        self.rows = np.zeros((16, 0))  # slot -> coefficients (>= form)
+        self.rhs = np.zeros(16)
+        self.active = np.zeros(16, dtype=bool)
+        self.n_slots = 0
+        self.free_slots = []
+        self.basis = None  # the last optimal basis (see .optimize)
+        self._bounds = None
+
+    def _var(self, name, typ):
+        if typ not in ("C", "R"):
+            raise NotImplementedError("only real variables are supported")
+        self.rows = np.pad(self.rows, ((0, 0), (0, 1)))
+        self.lbs.append(None)
+        self.ubs.append(None)
+        self._bounds = None
+        return self.VarInfo(name=name, typ=typ, id=len(self.vars))
+
+    def set_var_bounds(self, var, lb=None, ub=None):
+        self.lbs[var.id] = lb
+        self.ubs[var.id] = ub
+        self._bounds = None
+
+    def set_objective(self, coefs):
+        raise NotImplementedError("only feasibility is supported")
+
+    def add_constraint(self, coefs, lb=None, ub=None):
+        if isinstance(coefs, dict):
+            coefs = coefs.items()
+        assert lb is not None or ub is not None
+        row = np.zeros(len(self.vars))
+        for var, val in coefs:
+            row[var.id] += val
+
+        slots = []
+        if lb is not None:
+            slots.append(self._add_row(row, lb))
+        if ub is not None:
+            slots.append(self._add_row(-row, -ub))
+
+        cid = self._constraint_id
+        self._constraint_id += 1
+        self.constraints[cid] = tuple(slots)
+        return cid
+
+    def _add_row(self, row, rhs):
+        if self.free_slots:
+            slot = self.free_slots.pop()
+        else:
+            slot = self.n_slots
+            self.n_slots += 1
+            if slot == len(self.rhs):
+                grow = len(self.rhs)
+                self.rows = np.pad(self.rows, ((0, grow), (0, 0)))
+                self.rhs = np.pad(self.rhs, (0, grow))
+                self.active = np.pad(self.active, (0, grow))
+        self.rows[slot] = row
+        self.rhs[slot] = rhs
+        self.active[slot] = True
+        return slot
+
+    def set_active(self, cid, is_active):
+        for slot in self.constraints[cid]:
+            self.active[slot] = is_active
+
+    def remove_constraints(self, cids):
+        for cid in cids:
+            for slot in self.constraints.pop(cid):
+                self.active[slot] = False
+                self.free_slots.append(slot)
+        # slots may be reused by other rows
+        self.basis = None
+
+    def remove_constraint(self, cid):
+        self.remove_constraints((cid,))
+
+    def _bound_rows(self):
+        if self._bounds is None:
+            self._bounds = self._make_bound_rows()
+        return self._bounds
+
+    def _make_bound_rows(self):
+        n = len(self.vars)
+        rows = []
+        rhs = []
+        for i, (lb, ub) in enumerate(zip(self.lbs, self.ubs)):
+            if lb is not None:
+                rows.append(np.eye(1, n, i)[0])
+                rhs.append(lb)
+            if ub is not None:
+                rows.append(-np.eye(1, n, i)[0])
+                rhs.append(-ub)
+        return np.array(rows).reshape(-1, n), np.array(rhs, dtype=np.float64)
+
+    def optimize(self, solution_limit=1, log=None, only_best=True):
+        self.err = None
+        self.solutions = None
+
+        slots = np.flatnonzero(self.active[:self.n_slots])
+        bound_G, bound_h = self._bound_rows()
+        m = len(slots) + len(bound_h)
+
+        # previous basis, switched-off rows become ghost columns
+        basis = None
+        ghosts = []
+        if self.basis is not None:
+            offset = dict(bound=len(slots), aux=m)
+            basis = []
+            for kind, j in self.basis:
+                if kind != "row":
+                    basis.append(offset[kind] + j)
+                elif self.active[j]:
+                    basis.append(int(np.searchsorted(slots, j)))
+                else:
+                    basis.append(m + len(self.vars) + 1 + len(ghosts))
+                    ghosts.append(j)
+
+        lp = DenseFeasibility(
+            np.concatenate((self.rows[slots], bound_G)),
+            np.concatenate((self.rhs[slots], bound_h)),
+            ghosts=self.rows[ghosts],
+        )
+        w = lp.solve(basis=basis)
+
+        self.basis = []
+        for j in lp.basis.tolist():
+            if j < len(slots):
+                self.basis.append(("row", int(slots[j])))
+            elif j < m:
+                self.basis.append(("bound", j - len(slots)))
+            elif j <= m + len(self.vars):
+                self.basis.append(("aux", j - m))
+            else:
+                self.basis.append(("row", ghosts[j - m - len(self.vars) - 1]))
+
+        if w is None:
+            return False
+        if solution_limit > 0:
+            self.solutions = {
+                var: self.trunc(float(w[var.id]))
+                for var in self.vars.values()
+            },
+        return True
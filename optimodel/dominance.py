@@ -0,0 +1,82 @@
+"""
+Dominance pre-checks of oracle queries for upper sets
+(nonnegative inequalities).
+
+A bad point dominating an include point can not be cut:
+queries containing it are infeasible.
+For binary points, a set of bad points is cut by the "basic" inequality
+    sum_{i: u_i = 0} x_i >= 1
+of their join u (bitwise OR) iff u dominates no include point,
+which is a lookup in the upper closure of the include set (a DenseSet).
+"""
+
+import logging
+
+import numpy as np
+
+from monolearn.SparseSet import SparseSet
+
+from optimodel.inequality import Inequality
+
+
+class DominanceIndex:
+    log = logging.getLogger(f"{__name__}:DominanceIndex")
+
+    # upper closure bitmap size limit (2**MAX_N bits)
+    MAX_N = 28
+
+    def __init__(self, include, exclude, chunk=2**22):
+        self.n = exclude.n
+        self.upper = None
+        if exclude.is_binary and include.is_binary and self.n <= self.MAX_N:
+            self.upper = include.to_DenseSet()
+            self.upper.do_UpperSet()
+            self.codes = [int(c) for c in exclude.codes]
+            self.uncuttable = np.array(
+                [self.upper.get(c) for c in self.codes], dtype=bool,
+            )
+        else:
+            self.uncuttable = np.zeros(len(exclude), dtype=bool)
+            inc = include.matrix
+            step = max(1, chunk // max(1, len(inc) * self.n))
+            for start in range(0, len(exclude), step):
+                exc = exclude.matrix[start:start+step]
+                self.uncuttable[start:start+step] = (
+                    exc[:, None, :] >= inc[None, :, :]
+                ).all(axis=2).any(axis=1)
+
+        self.uncuttable_set = set(np.flatnonzero(self.uncuttable).tolist())
+
+        self.n_feasible = 0
+        self.n_infeasible = 0
+        self.log.info(
+            f"{len(self.uncuttable_set)} of {len(exclude)} exclude points"
+            " dominate include points"
+            + ("" if self.upper is not None else " (no join check)")
+        )
+
+    def check(self, bads: SparseSet):
+        """Returns (True, ineq), (False, None) or None if not settled."""
+        if self.uncuttable_set and not self.uncuttable_set.isdisjoint(bads):
+            self.n_infeasible += 1
+            return False, None
+
+        if self.upper is None:
+            return
+
+        join = 0
+        for i in bads:
+            join |= self.codes[i]
+        if self.upper.get(join):
+            return
+
+        self.n_feasible += 1
+        n = self.n
+        coefs = tuple(int(not (join >> (n - 1 - i)) & 1) for i in range(n))
+        return True, Inequality(coefs + (-1,))
+
+    def stat(self):
+        return (
+            f"dominance settled {self.n_feasible} feasible"
+            f" + {self.n_infeasible} infeasible"
+        )
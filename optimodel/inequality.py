@@ -1,3 +1,8 @@
+import numpy as np
+
+from optimodel.packed_points import as_matrix
+
+
 class Inequality(tuple):
     """Inequality wrapper
 
@@ -10,6 +15,18 @@ class Inequality(tuple):
         assert len(pt) + 1 == len(self)
         return inner(pt, self) + self[-1] >= 0
 
+    def satisfy_many(self, points):
+        """Vectorized satisfy: boolean vector over rows of points
+        ((N, n) matrix or PackedPoints)."""
+        return self.stack((self,)).satisfy_all(points)
+
+    def violated_mask(self, points):
+        return ~self.satisfy_many(points)
+
+    @classmethod
+    def stack(cls, ineqs, n=None):
+        return InequalitySystem(ineqs, n=n)
+
     def reorient(self, direction: tuple):
         assert len(self) == len(direction) + 1
 
@@ -27,5 +44,57 @@ class Inequality(tuple):
         return Inequality(ineq2)
 
 
+class InequalitySystem:
+    """Stacked inequalities evaluated against many points in one call.
+
+    Evaluation is a matrix product (m, n) x (n, N) in floating point
+    (BLAS; exact for integer coefficients up to 2^53),
+    done in chunks of points to bound the memory.
+    """
+    CHUNK = 2**24  # max. matrix entries per chunk
+
+    def __init__(self, ineqs, n=None):
+        self.ineqs = list(ineqs)
+        if n is None:
+            if not self.ineqs:
+                raise ValueError("unknown dimension (empty system)")
+            n = len(self.ineqs[0]) - 1
+        self.n = int(n)
+
+        coefs = np.array(self.ineqs, dtype=np.float64)
+        coefs = coefs.reshape(len(self.ineqs), self.n + 1)
+        self.A = coefs[:, :-1]
+        self.c = coefs[:, -1:]
+
+    def __len__(self):
+        return len(self.ineqs)
+
+    def _chunks(self, points):
+        matrix = as_matrix(points)
+        assert matrix.shape[1] == self.n
+        step = max(1, self.CHUNK // max(1, len(self.ineqs)))
+        for start in range(0, matrix.shape[0], step):
+            yield matrix[start:start+step].astype(np.float64)
+
+    def values(self, points):
+        """(m, N) matrix of values (a, x) + c."""
+        return self.A @ as_matrix(points).T.astype(np.float64) + self.c
+
+    def satisfy_matrix(self, points):
+        """(m, N) boolean matrix: i-th inequality satisfied by j-th point."""
+        return self.values(points) >= 0
+
+    def satisfy_all(self, points):
+        """(N,) boolean vector: point satisfies all inequalities."""
+        return np.concatenate([
+            (self.A @ chunk.T + self.c >= 0).all(axis=0)
+            for chunk in self._chunks(points)
+        ] or [np.ones(0, dtype=bool)])
+
+    def violated_any(self, points):
+        """(N,) boolean vector: point violates some inequality."""
+        return ~self.satisfy_all(points)
+
+
 def inner(a, b):
     return sum(aa * bb for aa, bb in zip(a, b))
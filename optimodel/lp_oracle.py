@@ -1,22 +1,133 @@
+import time
+import logging
+import multiprocessing
+
+import numpy as np
+
 from monolearn import Oracle
 from monolearn.SparseSet import SparseSet
 
 from optisolveapi.milp import MILP
 
+from optimodel.dense_lp import DenseLP
+from optimodel.dominance import DominanceIndex
 from optimodel.inequality import Inequality
+from optimodel.oracle_stats import OracleStats
+from optimodel.packed_points import PackedPoints
+from optimodel.query_cache import (
+    LRUDict, MonotoneQueryCache, CutPool, cut_set,
+)
+from optimodel.shared import SharedArray
 
 
 class LPbasedOracle(Oracle):
-    def __init__(self, pool, solver=None):
+    """
+    incremental:
+        every exclude point gets its row once (on the first query using it),
+        queries switch rows on/off by changing their bounds,
+        so that the solver warm-starts from the previous basis
+        (consecutive queries usually differ in a few points).
+        Supported for swiglpk, gurobi and native.
+    cache_size:
+        if nonzero, answer queries which are subsets of known feasible
+        or supersets of known infeasible ones without LP
+        (MonotoneQueryCache with cache_size feasible/infeasible entries).
+        Exact answers (Oracle._cache) are kept for the last
+        max(cache_size, EXACT_CACHE_SIZE) queries.
+    cut_pool_size:
+        if nonzero, keep up to cut_pool_size found inequalities
+        with the sets of exclude points they cut (CutPool)
+        and answer queries covered by one of them without LP.
+    report_cuts:
+        collect the full set of exclude points cut by each found inequality
+        (skipping sets covered by the cut pool),
+        to be added to the pool's system as lower elements
+        by .flush_system() after learning
+        (learn modules assume that only they modify the system).
+    cores:
+        for an infeasible query, extract a minimal infeasible subset
+        of its bad points (deletion filter, one LP per point),
+        which rules out all queries containing it (cache)
+        and is added to the pool's system as an upper element
+        by .flush_system().
+    lazy_include:
+        start with rows of a few include points only
+        (the MinSet for binary upper sets, otherwise extreme points)
+        and add the rows of include points violated by the found
+        inequality until it is valid (cutting planes);
+        the added rows are kept for later queries.
+    dominance:
+        for upper sets, settle queries with a bad point dominating
+        an include point (infeasible) or, for binary points,
+        with the join of the bad points dominating no include point
+        (feasible by its basic inequality) without LP (DominanceIndex).
+    verify:
+        check of each found inequality against the include points
+        (the queried bad points are always checked):
+        "full" - all points (matrix-vector product),
+        "sampled" - verify_sample random points,
+        "off" - no check (the chosen subset is verified at the end,
+        see ConstraintPool.report).
+    """
+    log = logging.getLogger(f"{__name__}:LPbasedOracle")
+
+    VERIFY_LEVELS = ("off", "sampled", "full")
+    EXACT_CACHE_SIZE = 2**16
+
+    def __init__(
+        self, pool, solver=None, incremental=False,
+        cache_size=0, cut_pool_size=0, report_cuts=False, cores=False,
+        lazy_include=False, dominance=False,
+        verify="full", verify_sample=256,
+    ):
         super().__init__()
+        self.exact_cache_size = max(cache_size, self.EXACT_CACHE_SIZE)
+        self._cache = LRUDict(self.exact_cache_size)
 
         self.solver = solver
+        self.incremental = incremental
         self.n_calls = 0
         self.model = None
         self.pool = pool
+        self.stats = OracleStats()
+        self.lp_times = [0.0, 0.0]  # build, solve time of the current LP
+
+        self.cache = MonotoneQueryCache(cache_size) if cache_size else None
+        self.cuts = (
+            CutPool(pool.exclude, cut_pool_size) if cut_pool_size else None
+        )
+        self.report_cuts = report_cuts
+        self.found_cuts = {}  # cut set -> inequality
+        self.n_reported = 0
+        self.cores = cores
+        self.found_cores = set()
+        self.n_cores = 0
+        self.lazy_include = lazy_include
+        self.n_lazy_rounds = 0
+        if verify not in self.VERIFY_LEVELS:
+            raise ValueError(
+                f"unknown verification level {verify}"
+                f" (supported: {', '.join(self.VERIFY_LEVELS)})"
+            )
+        self.verify = verify
+        self.verify_sample = int(verify_sample)
+        self.rng = np.random.default_rng()
+        self._include_float = None
+        self._exclude_float = None
+        self._bad_constraints = {}
+        self.dominance = (
+            DominanceIndex(pool.include, pool.exclude)
+            if dominance and pool.is_upper else None
+        )
+
+    def clean(self, levels=True, main=True):
+        super().clean(levels=levels, main=main)
+        if main:
+            self._cache = LRUDict(self.exact_cache_size)
 
     def _prepare_constraints(self):
         self.model = MILP.feasibility(solver=self.solver)
+        self._bad_constraints = {}  # refer to the model's variables
 
         if self.pool.is_upper:
             lb = 0  # monotone => nonnegative
@@ -31,54 +142,599 @@ class LPbasedOracle(Oracle):
         self.c = self.model.var_real("c", lb=lb, ub=None)
         self.xsc = self.xs + [self.c]
 
-        for p in self.pool.include:
+        self.include_rows = set()
+        if self.lazy_include:
+            self._add_include_rows(self._initial_include())
+        else:
+            self._add_include_rows(range(len(self.pool.include)))
+
+        if self.incremental:
+            self.rows = RowToggle.create(self.model)
+            self.bad_rows = {}  # exclude index -> row
+            self.active = set()
+
+    LAZY_ROWS_PER_ROUND = 32
+
+    def _initial_include(self):
+        include = self.pool.include
+        if not len(include):
+            return ()
+        if self.pool.is_upper and include.is_binary:
+            # nonnegative inequalities: valid on the MinSet => valid
+            minset = PackedPoints.from_DenseSet(include.to_DenseSet().MinSet())
+            return include.indices(minset.codes).tolist()
+
+        matrix = include.matrix
+        inds = {0, len(include) - 1}
+        inds.update(matrix.argmin(axis=0).tolist())
+        inds.update(matrix.argmax(axis=0).tolist())
+        weights = matrix.sum(axis=1, dtype=np.int64)
+        inds.add(int(weights.argmin()))
+        inds.add(int(weights.argmax()))
+        return sorted(inds)
+
+    def _add_include_rows(self, inds):
+        matrix = self.pool.include.matrix
+        for i in inds:
+            if i in self.include_rows:
+                continue
+            self.include_rows.add(i)
             # ... >= c
             # ... -c >= 0
             self.model.add_constraint(
-                zip(self.xsc, p + (-1,)),
+                zip(self.xsc, matrix[i].tolist() + [-1]),
                 lb=0,
             )
 
-        self.i2cs = []
-        for q in self.pool.i2exc:
-            # ... <= c - 1
-            # ... -c <= -1
-            self.i2cs.append(dict(
-                coefs=tuple(zip(self.xsc, q + (-1,))),
+    def _bad_constraint(self, i):
+        # ... <= c - 1
+        # ... -c <= -1
+        cons = self._bad_constraints.get(i)
+        if cons is None:
+            q = self.pool.exclude.matrix[i].tolist()
+            cons = self._bad_constraints[i] = dict(
+                coefs=tuple(zip(self.xsc, q + [-1])),
                 ub=-1,
-            ))
+            )
+        return cons
 
     def _query(self, bads: SparseSet):
         assert isinstance(bads, SparseSet)
         if not bads:
             # trivial inequality
             ineq = Inequality((0,) * self.pool.n + (0,))
+            self.stats.hit("trivial")
             return True, ineq
 
+        ret = self._lookup(bads)
+        if ret is None:
+            ret, core = self._solve(bads)
+            self._record(bads, ret, core)
+        return ret
+
+    def _lookup(self, bads: SparseSet):
+        """Answer from the dominance index, the cache or the cut pool
+        (None if unknown)."""
+        sources = (
+            ("dominance", self.dominance, "check"),
+            ("cache", self.cache, "lookup"),
+            ("cut_pool", self.cuts, "lookup"),
+        )
+        for source, index, method in sources:
+            if index is None:
+                continue
+            ret = getattr(index, method)(bads)
+            if ret is not None:
+                self.stats.hit(source)
+                return ret
+
+    def _solve(self, bads: SparseSet):
+        """LP answer and an infeasible core (if enabled and infeasible)."""
+        ret = self._query_lp(bads)
+        core = None
+        if self.cores and not ret[0]:
+            core = self._infeasible_core(bads)
+        return ret, core
+
+    def _infeasible_core(self, bads: SparseSet):
+        """Minimal infeasible subset of bads (deletion filter)."""
+        core = list(bads)
+        for i in bads:
+            if len(core) == 1:
+                break
+            rest = SparseSet(j for j in core if j != i)
+            if not self._query_lp(rest)[0]:
+                core = list(rest)
+        return SparseSet(core)
+
+    def _record(self, bads: SparseSet, ret, core: SparseSet = None):
+        """Store an LP answer in the cache and the cut pool."""
+        if self.cache is not None:
+            self.cache.add(bads, *ret)
+        is_feasible, ineq = ret
+        if not is_feasible:
+            if core is not None:
+                if self.cache is not None and core != bads:
+                    self.cache.add(core, False)
+                self.found_cores.add(core)
+            return
+
+        if self.cuts is not None:
+            cut = self.cuts.add(ineq)
+        elif self.report_cuts:
+            cut = cut_set(ineq, self.pool.exclude)
+        else:
+            cut = None
+
+        if self.report_cuts and cut is not None and len(cut) > len(bads):
+            self.found_cuts.setdefault(cut, ineq)
+
+    def flush_system(self):
+        """Add the collected cut sets and infeasible cores to the system
+        as lower and upper elements respectively."""
+        system = self.pool.system
+        n_cuts = 0
+        for cut, ineq in self.found_cuts.items():
+            if not system.is_known_lower(cut):
+                system.add_lower(cut, meta=ineq)
+                n_cuts += 1
+        self.found_cuts.clear()
+        self.n_reported += n_cuts
+
+        n_cores = 0
+        for core in self.found_cores:
+            if not system.is_known_upper(core):
+                system.add_upper(core, is_prime=True)
+                n_cores += 1
+        self.found_cores.clear()
+        self.n_cores += n_cores
+
+        if n_cuts or n_cores:
+            self.log.info(
+                f"added {n_cuts} cut sets"
+                f" and {n_cores} infeasible cores to the system"
+            )
+            system.save()
+
+    def query_many(self, vecs):
+        """Answer a batch of independent queries (list of answers).
+        Answers are also stored in the oracle's cache."""
+        return [self(vec) for vec in vecs]
+
+    def close(self):
+        pass
+
+    def _query_lp(self, bads: SparseSet):
+        t0 = time.perf_counter()
         if self.model is None:
             self._prepare_constraints()
+        self.lp_times = [time.perf_counter() - t0, 0.0]
 
+        ret = self._run_lp(bads)
+        self.stats.lp(len(bads), ret[0], *self.lp_times)
+        return ret
+
+    def _run_lp(self, bads: SparseSet):
         self.n_calls += 1
 
+        while True:
+            if self.incremental:
+                sol = self._solve_toggle(bads)
+            else:
+                sol = self._solve_add_remove(bads)
+
+            if sol is None:
+                # a relaxation is infeasible
+                return False, None
+
+            val_xs = tuple(sol[x] for x in self.xs)
+            val_c = sol[self.c]
+
+            if not all(isinstance(v, int) for v in val_xs + (val_c,)):
+                # if non-integral coefficients,
+                # keep real ineq, put the separator in the middle
+                # (can be massaged later..)
+                val_c -= 0.5
+
+            ineq = Inequality(val_xs + (-val_c,))
+            if not self.lazy_include:
+                break
+
+            values = self._include_values(ineq)
+            violated = np.flatnonzero(values < 0)
+            if not len(violated):
+                break
+
+            self.n_lazy_rounds += 1
+            violated = violated[
+                np.argsort(values[violated], kind="stable")
+                [:self.LAZY_ROWS_PER_ROUND]
+            ]
+            t0 = time.perf_counter()
+            self._add_include_rows(violated.tolist())
+            self.lp_times[0] += time.perf_counter() - t0
+
+        if not self.lazy_include:
+            # (lazy: all include points are checked already)
+            self._verify(ineq)
+        assert (self._exclude_values(ineq, list(bads)) < 0).all()
+        return True, ineq
+
+    def _include_values(self, ineq, rows=None):
+        """Values of the inequality on (the given rows of) include points."""
+        if self._include_float is None:
+            self._include_float = self.pool.include.matrix.astype(np.float64)
+        return self._values(self._include_float, ineq, rows)
+
+    def _exclude_values(self, ineq, rows):
+        """Values of the inequality on the given rows of exclude points."""
+        if self._exclude_float is None:
+            self._exclude_float = self.pool.exclude.matrix.astype(np.float64)
+        return self._values(self._exclude_float, ineq, rows)
+
+    @staticmethod
+    def _values(points, ineq, rows=None):
+        if rows is not None:
+            points = points[rows]
+        return points @ np.array(ineq[:-1], dtype=np.float64) + ineq[-1]
+
+    def _verify(self, ineq):
+        n_include = len(self.pool.include)
+        if self.verify == "off" or not n_include:
+            return
+        rows = None
+        if self.verify == "sampled" and n_include > self.verify_sample:
+            rows = self.rng.choice(
+                n_include, min(self.verify_sample, n_include), replace=False,
+            )
+        assert (self._include_values(ineq, rows) >= 0).all(), \
+            f"oracle: invalid inequality {ineq}"
+
+    def log_stat(self):
+        msg = f"oracle: n_calls {self.n_calls}"
+        if self.dominance is not None:
+            msg += f", {self.dominance.stat()}"
+        if self.cache is not None:
+            msg += f", {self.cache.stat()}"
+        if self.cuts is not None:
+            msg += f", {self.cuts.stat()}"
+        if self.report_cuts:
+            msg += f", added {self.n_reported} cut sets"
+        if self.cores:
+            msg += f", added {self.n_cores} infeasible cores"
+        if self.lazy_include and self.model is not None:
+            msg += (
+                f", include rows {len(self.include_rows)}"
+                f"/{len(self.pool.include)}"
+                f" ({self.n_lazy_rounds} extra rounds)"
+            )
+        self.log.info(msg)
+        self.stats.log_histograms()
+
+    def _solve_add_remove(self, bads):
         LP = self.model
-        cs = [LP.add_constraint(**self.i2cs[i]) for i in bads]
+        t0 = time.perf_counter()
+        cs = [LP.add_constraint(**self._bad_constraint(i)) for i in bads]
+        t1 = time.perf_counter()
         res = LP.optimize(log=0)
+        t2 = time.perf_counter()
         LP.remove_constraints(cs)
+        self.lp_times[0] += (t1 - t0) + (time.perf_counter() - t2)
+        self.lp_times[1] += t2 - t1
 
         if res is False or res is None:
-            return False, None
+            return
+        return LP.solutions[0]
 
-        sol = LP.solutions[0]
-        val_xs = tuple(sol[x] for x in self.xs)
-        val_c = sol[self.c]
+    def _solve_toggle(self, bads):
+        t0 = time.perf_counter()
+        rows = self.rows
+        query = set(bads)
+        for i in self.active - query:
+            rows.disable(self.bad_rows[i])
+        for i in query - self.active:
+            if i in self.bad_rows:
+                rows.enable(self.bad_rows[i])
+            else:
+                self.bad_rows[i] = self.model.add_constraint(
+                    **self._bad_constraint(i)
+                )
+        self.active = query
+        t1 = time.perf_counter()
+        sol = rows.solve()
+        self.lp_times[0] += t1 - t0
+        self.lp_times[1] += time.perf_counter() - t1
+        return sol
 
-        if not all(isinstance(v, int) for v in val_xs + (val_c,)):
-            # if non-integral coefficients,
-            # keep real ineq, put the separator in the middle
-            # (can be massaged later..)
-            val_c -= 0.5
 
-        ineq = Inequality(val_xs + (-val_c,))
-        assert all(ineq.satisfy(p) for p in self.pool.include)
-        assert all(not ineq.satisfy(self.pool.i2exc[i]) for i in bads)
-        return True, ineq
+class ParallelLPOracle(LPbasedOracle):
+    """LPbasedOracle solving batches of queries (query_many)
+    in worker processes, each with its own prepared LP model.
+
+    Single queries (and batches with a single LP to solve)
+    are solved in the main process.
+    """
+    def __init__(self, pool, workers=2, **opts):
+        super().__init__(pool, **opts)
+        self.workers = int(workers)
+        self.worker_pool = None
+        self.shared = None
+        self.worker_opts = dict(
+            solver=self.solver, incremental=self.incremental,
+            cores=self.cores, lazy_include=self.lazy_include,
+            verify=self.verify, verify_sample=self.verify_sample,
+        )
+
+    def _start_workers(self):
+        self.shared = (
+            SharedArray(self.pool.include.matrix),
+            SharedArray(self.pool.exclude.matrix),
+        )
+        self.worker_pool = multiprocessing.Pool(
+            processes=self.workers,
+            initializer=_oracle_worker_init,
+            initargs=(self.pool.is_upper, *self.shared, self.worker_opts),
+        )
+        self.log.info(f"started {self.workers} oracle workers")
+
+    def close(self):
+        if self.worker_pool is not None:
+            self.worker_pool.terminate()
+            self.worker_pool.join()
+            self.worker_pool = None
+        if self.shared is not None:
+            for arr in self.shared:
+                arr.unlink()
+            self.shared = None
+
+    def _query(self, bads: SparseSet):
+        return self._query_many([bads])[0]
+
+    def query_many(self, vecs):
+        """Oracle.__call__ for a batch: queries known from the oracle's
+        caches are answered (and counted) as there, the rest is solved
+        by _query_many."""
+        answers = {}
+        todo = []
+        for vec in vecs:
+            self.n_calls += 1
+            if vec in answers:
+                continue
+            ret = answers[vec] = self._known(vec)
+            if ret is None:
+                self.n_queries += 1
+                todo.append(vec)
+
+        for vec, ret in zip(todo, self._query_many(todo)):
+            answers[vec] = ret
+            if self._cache is not None:
+                self._cache[vec] = ret
+        return [answers[vec] for vec in vecs]
+
+    def _known(self, vec: SparseSet):
+        """Answer from the oracle's caches, as in Oracle.__call__
+        (None if unknown)."""
+        if self._cache and vec in self._cache:
+            return self._cache[vec]
+        if self._lower_cache.has(vec):
+            return True, self._lower_cache.meta.get(vec, self.UnknownMeta)
+        if self._upper_cache.has(vec):
+            return False, self._upper_cache.meta.get(vec, self.UnknownMeta)
+
+    def _query_many(self, vecs):
+        """_query for a batch of distinct vectors."""
+        answers = {}
+        todo = []
+        for vec in vecs:
+            if not vec:
+                answers[vec] = LPbasedOracle._query(self, vec)
+                continue
+            ret = self._lookup(vec)
+            if ret is not None:
+                answers[vec] = ret
+                continue
+            todo.append(vec)
+
+        if len(todo) == 1:
+            rets = [self._solve(todo[0])]
+        elif todo:
+            if self.worker_pool is None:
+                self._start_workers()
+            chunk = max(1, min(64, len(todo) // (self.workers * 4)))
+            chunks = [todo[i:i+chunk] for i in range(0, len(todo), chunk)]
+            rets = []
+            for results, n_calls, stats in \
+                    self.worker_pool.imap(_oracle_worker, chunks):
+                rets.extend(results)
+                self.n_calls += n_calls
+                self.stats.merge(stats)
+        else:
+            rets = []
+
+        for vec, (ret, core) in zip(todo, rets):
+            answers[vec] = ret
+            self._record(vec, ret, core)
+        return [answers[vec] for vec in vecs]
+
+
+class OraclePoints:
+    """The part of ConstraintPool used by LPbasedOracle."""
+    def __init__(self, is_upper, include, exclude):
+        self.n = exclude.n
+        self.is_upper = is_upper
+        self.include = include
+        self.exclude = exclude
+
+
+# ParallelLPOracle worker processes: points are shared read-only
+_worker_oracle = None
+
+
+def _oracle_worker_init(is_upper, include, exclude, opts):
+    global _worker_oracle
+    points = OraclePoints(
+        is_upper=is_upper,
+        include=PackedPoints.from_sorted_matrix(include.array),
+        exclude=PackedPoints.from_sorted_matrix(exclude.array),
+    )
+    points.shared = include, exclude  # keep the shared memory attached
+    _worker_oracle = LPbasedOracle(pool=points, **opts)
+
+
+def _oracle_worker(vecs):
+    n_calls = _worker_oracle.n_calls
+    results = [_worker_oracle._solve(vec) for vec in vecs]
+    stats = _worker_oracle.stats
+    _worker_oracle.stats = OracleStats()
+    return results, _worker_oracle.n_calls - n_calls, stats
+
+
+class RowToggle:
+    """Switching rows of a MILP model on/off through their bounds
+    and re-solving from the current basis (backend-specific).
+
+    Rows are added as usual (.add_constraint with a single bound)
+    and are enabled initially.
+    """
+    BY_SOLVER = {}
+
+    def __init__(self, model):
+        self.model = model
+
+    @classmethod
+    def register(cls, solver):
+        def deco(subcls):
+            cls.BY_SOLVER[solver] = subcls
+            return subcls
+        return deco
+
+    @classmethod
+    def create(cls, model):
+        solver = (model.solver or "").lower()
+        if solver not in cls.BY_SOLVER:
+            raise ValueError(
+                f"incremental LP oracle is not supported for solver {solver}"
+                f" (supported: {', '.join(cls.BY_SOLVER)})"
+            )
+        return cls.BY_SOLVER[solver](model)
+
+    def enable(self, row):
+        raise NotImplementedError
+
+    def disable(self, row):
+        raise NotImplementedError
+
+    def solve(self):
+        """Returns solution dict (var -> value) or None if infeasible."""
+        raise NotImplementedError
+
+
+@RowToggle.register("swiglpk")
+class RowToggleGLPK(RowToggle):
+    def __init__(self, model):
+        super().__init__(model)
+
+        import swiglpk as glpk
+        self.glpk = glpk
+
+        self.parm = glpk.glp_smcp()
+        glpk.glp_init_smcp(self.parm)
+        self.parm.msg_lev = glpk.GLP_MSG_OFF
+        # zero objective: any basis is dual feasible,
+        # and toggling rows on only breaks primal feasibility
+        self.parm.meth = glpk.GLP_DUALP
+        # no presolve: it would discard the basis
+        self.parm.presolve = glpk.GLP_OFF
+
+        self.bounds = {}  # row -> enabled bounds
+        glpk.glp_std_basis(self.model.model)
+
+    def _rowid(self, row):
+        return self.model.constraints[row]
+
+    def enable(self, row):
+        self._set_bounds(row, *self.bounds.pop(row))
+
+    def disable(self, row):
+        glpk = self.glpk
+        rowid = self._rowid(row)
+        self.bounds[row] = (
+            glpk.glp_get_row_type(self.model.model, rowid),
+            glpk.glp_get_row_lb(self.model.model, rowid),
+            glpk.glp_get_row_ub(self.model.model, rowid),
+        )
+        self._set_bounds(row, glpk.GLP_FR, 0.0, 0.0)
+
+    def _set_bounds(self, row, typ, lb, ub):
+        self.glpk.glp_set_row_bnds(
+            self.model.model, self._rowid(row), typ, lb, ub,
+        )
+
+    def solve(self):
+        glpk = self.glpk
+        model = self.model.model
+
+        ret = glpk.glp_simplex(model, self.parm)
+        if ret in (glpk.GLP_EBADB, glpk.GLP_ESING, glpk.GLP_ECOND):
+            # broken basis, restart from scratch
+            glpk.glp_adv_basis(model, 0)
+            ret = glpk.glp_simplex(model, self.parm)
+        if ret != 0:
+            raise RuntimeError(f"unknown GLPK error (simplex): {ret}")
+
+        status = glpk.glp_get_status(model)
+        if status in (glpk.GLP_NOFEAS, glpk.GLP_INFEAS):
+            return
+        assert status in (glpk.GLP_OPT, glpk.GLP_FEAS), \
+            f"unknown GLPK status: {status}"
+
+        return {
+            var: self.model.trunc(glpk.glp_get_col_prim(model, var.id))
+            for var in self.model.vars.values()
+        }
+
+
+@RowToggle.register("gurobi")
+class RowToggleGurobi(RowToggle):
+    """Gurobi warm-starts from the previous basis by itself
+    after changes of the right-hand sides."""
+    def __init__(self, model):
+        super().__init__(model)
+
+        from gurobipy import GRB
+        self.INF = GRB.INFINITY
+
+        self.rhs = {}  # row -> enabled rhs
+
+    def enable(self, row):
+        row.RHS = self.rhs.pop(row)
+
+    def disable(self, row):
+        self.rhs[row] = row.RHS
+        # rows are of the form expr <= ub
+        row.RHS = self.INF
+
+    def solve(self):
+        res = self.model.optimize(log=0)
+        if res is False or res is None:
+            return
+        return self.model.solutions[0]
+
+
+@RowToggle.register("native")
+class RowToggleNative(RowToggle):
+    """DenseLP keeps switched-off rows and reuses its last basis itself."""
+    def __init__(self, model):
+        assert isinstance(model, DenseLP)
+        super().__init__(model)
+
+    def enable(self, row):
+        self.model.set_active(row, True)
+
+    def disable(self, row):
+        self.model.set_active(row, False)
+
+    def solve(self):
+        if not self.model.optimize(log=0):
+            return
+        return self.model.solutions[0]
@@ -0,0 +1,149 @@
+"""
+Per-query statistics of the LP oracle.
+
+Each query is settled either by an LP (with its build and solve time)
+or by one of the shortcuts (cache, cut pool, dominance, ...).
+LPs are aggregated into log2 histograms by solve time and by query size,
+together with the slowest ones, so that a run dominated by many cheap LPs
+can be told from one dominated by a few pathological ones.
+LP build/solve times are also added to TimeStat.
+"""
+
+import heapq
+import logging
+
+from collections import Counter
+
+from monolearn.utils import TimeStat
+
+
+def log2_bucket(value: float) -> int:
+    """Bucket b of value in [2^b, 2^(b+1)) (0 for value < 2)."""
+    return max(int(value), 1).bit_length() - 1
+
+
+def bucket_label(b: int, unit="") -> str:
+    """Integer range of log2_bucket b (bucket 0 starts at 0)."""
+    lo = 2**b if b else 0
+    return f"{lo}-{2**(b+1) - 1}{unit}"
+
+
+class OracleStats:
+    log = logging.getLogger(f"{__name__}:OracleStats")
+
+    TIMESTAT_BUILD = "LPbasedOracle.lp_build"
+    TIMESTAT_SOLVE = "LPbasedOracle.lp_solve"
+    N_SLOWEST = 5
+
+    def __init__(self):
+        for name in (self.TIMESTAT_BUILD, self.TIMESTAT_SOLVE):
+            TimeStat.Stat.setdefault(name, TimeStat())
+        self.reset()
+
+    def reset(self):
+        self.by_source = Counter()  # lp / cache / cut_pool / ...
+        self.lp_outcomes = Counter()  # feasible / infeasible
+        self.lp_build_time = 0.0
+        self.lp_solve_time = 0.0
+        self.hist_time = Counter()  # log2 bucket of solve time (us) -> #
+        self.hist_size = Counter()  # log2 bucket of query size -> #
+        self.time_by_size = Counter()  # log2 bucket of query size -> s
+        self.slowest = []  # heap of (solve time, query size, feasible)
+
+    def hit(self, source: str):
+        """Query answered without LP."""
+        self.by_source[source] += 1
+
+    def lp(self, size: int, is_feasible: bool, build: float, solve: float):
+        """Query answered by an LP (times in seconds)."""
+        self.by_source["lp"] += 1
+        self.lp_outcomes["feasible" if is_feasible else "infeasible"] += 1
+        self.lp_build_time += build
+        self.lp_solve_time += solve
+        self.hist_time[log2_bucket(solve * 1e6)] += 1
+        self.hist_size[log2_bucket(size)] += 1
+        self.time_by_size[log2_bucket(size)] += build + solve
+
+        item = solve, size, is_feasible
+        if len(self.slowest) < self.N_SLOWEST:
+            heapq.heappush(self.slowest, item)
+        else:
+            heapq.heappushpop(self.slowest, item)
+
+        TimeStat.Stat[self.TIMESTAT_BUILD].add(time=build)
+        TimeStat.Stat[self.TIMESTAT_SOLVE].add(time=solve)
+
+    def merge(self, other: "OracleStats"):
+        """Add statistics collected elsewhere (e.g. in a worker process)."""
+        self.by_source.update(other.by_source)
+        self.lp_outcomes.update(other.lp_outcomes)
+        self.lp_build_time += other.lp_build_time
+        self.lp_solve_time += other.lp_solve_time
+        self.hist_time.update(other.hist_time)
+        self.hist_size.update(other.hist_size)
+        self.time_by_size.update(other.time_by_size)
+        for item in other.slowest:
+            if len(self.slowest) < self.N_SLOWEST:
+                heapq.heappush(self.slowest, item)
+            else:
+                heapq.heappushpop(self.slowest, item)
+
+        n_lp = other.by_source["lp"]
+        if n_lp:
+            # worker processes have their own TimeStat
+            TimeStat.Stat[self.TIMESTAT_BUILD].add(
+                time=other.lp_build_time, num=n_lp,
+            )
+            TimeStat.Stat[self.TIMESTAT_SOLVE].add(
+                time=other.lp_solve_time, num=n_lp,
+            )
+
+    def summary(self) -> dict:
+        """JSON-serializable summary."""
+        n_lp = self.by_source["lp"]
+        return dict(
+            queries=sum(self.by_source.values()),
+            by_source=dict(self.by_source),
+            lp=dict(
+                calls=n_lp,
+                feasible=self.lp_outcomes["feasible"],
+                infeasible=self.lp_outcomes["infeasible"],
+                build_time=self.lp_build_time,
+                solve_time=self.lp_solve_time,
+                avg_solve_time=self.lp_solve_time / n_lp if n_lp else None,
+            ),
+            solve_time_us_hist={
+                bucket_label(b): self.hist_time[b]
+                for b in sorted(self.hist_time)
+            },
+            query_size_hist={
+                bucket_label(b): self.hist_size[b]
+                for b in sorted(self.hist_size)
+            },
+            time_by_query_size={
+                bucket_label(b): self.time_by_size[b]
+                for b in sorted(self.time_by_size)
+            },
+            slowest=[
+                dict(solve_time=t, size=size, feasible=ok)
+                for t, size, ok in sorted(self.slowest, reverse=True)
+            ],
+        )
+
+    def log_histograms(self):
+        if not self.by_source["lp"]:
+            return
+        total = self.by_source["lp"]
+        self.log.info("LP solve time histogram:")
+        for b in sorted(self.hist_time):
+            num = self.hist_time[b]
+            self.log.info(
+                f"  {bucket_label(b, 'us'):>16s}: {num:9d}"
+                f" ({num / total * 100:5.1f}%)"
+            )
+        self.log.info("LP query size histogram (count, total time):")
+        for b in sorted(self.hist_size):
+            self.log.info(
+                f"  {bucket_label(b):>16s}: {self.hist_size[b]:9d}"
+                f" {self.time_by_size[b]:9.3f}s"
+            )
@@ -0,0 +1,416 @@
+import hashlib
+
+from collections.abc import Mapping, Sequence
+
+import numpy as np
+
+from subsets import DenseSet
+
+
+class PackedPoints(Sequence):
+    """Sorted set of points with integer coordinates.
+
+    Points are stored once, as an (N, n) matrix in lexicographic order
+    (same as ``sorted()`` on tuples). Each point is also packed into
+    a single integer code (mixed radix, first coordinate is the most
+    significant digit, i.e. ``Bin(pt).int`` for binary points),
+    codes are sorted and give a vectorized point -> index lookup.
+    Negative coordinates are shifted by offset (the minimum) for packing.
+
+    As a sequence, behaves as a (read-only) list of tuples.
+    """
+
+    offset = 0  # added to the digits of codes to get coordinates
+
+    def __init__(self, points=(), n: int = None):
+        if isinstance(points, PackedPoints):
+            self.__dict__.update(points.__dict__)
+            return
+
+        if isinstance(points, np.ndarray):
+            matrix = points
+        else:
+            matrix = [tuple(pt) for pt in points]
+            if n is None:
+                n = len(matrix[0]) if matrix else 0
+            matrix = np.array(matrix, dtype=np.int64).reshape(-1, n)
+
+        if matrix.ndim != 2:
+            raise ValueError(f"expected (N, n) matrix, got shape {matrix.shape}")
+        if n is not None and matrix.shape[1] != n:
+            raise ValueError(f"dimension mismatch: {matrix.shape[1]} != {n}")
+
+        self.n = matrix.shape[1]
+        self._set_range(matrix)
+
+        codes = self.pack(matrix)
+        codes, first = np.unique(codes, return_index=True)
+        self.codes = codes
+        self._matrix = np.ascontiguousarray(
+            matrix[first], dtype=self._matrix_dtype()
+        )
+        self._index_map = None
+
+    @classmethod
+    def coerce(cls, points, n: int = None):
+        if isinstance(points, cls):
+            return points
+        return cls(points, n=n)
+
+    @classmethod
+    def from_codes(cls, codes, n: int, is_sorted: bool = False):
+        """Binary points given by their integer codes (Bin(pt).int).
+
+        With is_sorted=True, codes must be a sorted array without duplicates
+        and is used as is (no copy, e.g. shared memory).
+        """
+        self = cls.__new__(cls)
+        self.n = int(n)
+        self.radix = 2
+        if is_sorted:
+            self.codes = codes
+        else:
+            self.codes = np.unique(np.asarray(codes, dtype=self._codes_dtype()))
+        self._matrix = None
+        self._index_map = None
+        return self
+
+    @classmethod
+    def from_sorted_matrix(cls, matrix):
+        """Points given by an (N, n) matrix of sorted distinct rows
+        (e.g. PackedPoints.matrix saved earlier), used as is
+        (no copy, e.g. a memory-mapped array)."""
+        if matrix.ndim != 2:
+            raise ValueError(f"expected (N, n) matrix, got shape {matrix.shape}")
+        self = cls.__new__(cls)
+        self.n = matrix.shape[1]
+        self._set_range(matrix)
+        self.codes = self.pack(matrix)
+        self._matrix = matrix
+        self._index_map = None
+        return self
+
+    @classmethod
+    def from_DenseSet(cls, d: DenseSet):
+        """Binary points of the DenseSet (read from its bitmap)."""
+        return cls.from_codes(denseset_codes(d), d.n, is_sorted=True)
+
+    def to_DenseSet(self) -> DenseSet:
+        """DenseSet of the (binary) points."""
+        assert self.is_binary
+        return denseset_from_codes(self.codes, self.n)
+
+    @property
+    def matrix(self):
+        """(N, n) matrix of points (unpacked on demand)."""
+        if self._matrix is None:
+            self._matrix = self.unpack(self.codes)
+        return self._matrix
+
+    # ========================================
+    # packing
+    # ========================================
+
+    def _set_range(self, matrix):
+        lo = int(matrix.min()) if matrix.size else 0
+        hi = int(matrix.max()) if matrix.size else 0
+        self.offset = min(0, lo)
+        self.radix = max(2, hi - self.offset + 1)
+
+    def _codes_dtype(self):
+        if self.n * (self.radix - 1).bit_length() <= 64:
+            return np.uint64
+        return object
+
+    def _matrix_dtype(self):
+        if self.offset or self.radix > 256:
+            return np.int64
+        return np.uint8
+
+    @property
+    def is_binary(self):
+        return self.radix == 2 and not self.offset
+
+    def pack(self, matrix):
+        """Pack rows of the (N, n) matrix into integer codes."""
+        matrix = np.asarray(matrix)
+        dtype = self._codes_dtype()
+        codes = np.zeros(matrix.shape[0], dtype=dtype)
+        radix = dtype(self.radix) if dtype is np.uint64 else self.radix
+        for i in range(self.n):
+            digits = matrix[:, i]
+            if self.offset:
+                digits = digits.astype(np.int64) - self.offset
+            codes = codes * radix + digits.astype(dtype)
+        return codes
+
+    def pack_point(self, pt):
+        code = 0
+        for v in pt:
+            code = code * self.radix + int(v) - self.offset
+        return code
+
+    def unpack(self, codes):
+        """Unpack integer codes into an (N, n) matrix."""
+        codes = np.array(codes, dtype=self._codes_dtype())
+        matrix = np.zeros((len(codes), self.n), dtype=self._matrix_dtype())
+        radix = self.radix
+        if codes.dtype != object:
+            radix = codes.dtype.type(radix)
+        for i in reversed(range(self.n)):
+            matrix[:, i] = codes % radix
+            codes //= radix
+        if self.offset:
+            matrix += self.offset
+        return matrix
+
+    def digest(self) -> str:
+        """Content hash (hex) of the point set."""
+        h = hashlib.blake2b(digest_size=16)
+        h.update(f"{self.n}:{self.radix}:{len(self)}:".encode())
+        if self.offset:
+            h.update(f"{self.offset}:".encode())
+        if self.codes.dtype != object:
+            h.update(self.codes.astype("<u8").tobytes())
+        else:
+            width = (self.n * (self.radix - 1).bit_length() + 7) // 8
+            for code in self.codes:
+                h.update(int(code).to_bytes(width, "little"))
+        return h.hexdigest()
+
+    # ========================================
+    # lookup
+    # ========================================
+
+    def indices(self, codes):
+        """Vectorized lookup of codes, -1 for points not in the set."""
+        codes = np.asarray(codes, dtype=self.codes.dtype)
+        pos = np.searchsorted(self.codes, codes)
+        pos[pos == len(self.codes)] = 0
+        found = (self.codes[pos] == codes) if len(self.codes) else False
+        return np.where(found, pos, -1)
+
+    def find(self, pt):
+        """Index of the point (tuple), -1 if not in the set."""
+        lo, hi = self.offset, self.offset + self.radix
+        if len(pt) != self.n or any(v < lo or v >= hi for v in pt):
+            return -1
+        return int(self.indices([self.pack_point(pt)])[0])
+
+    def index(self, pt):
+        i = self.find(pt)
+        if i < 0:
+            raise ValueError(f"{pt} is not in the set")
+        return i
+
+    def cube_indices(self, a: int, u: int):
+        """Sorted indices of (binary) points in the cube a ^ LowerSet(u),
+        i.e. x with x & ~u == a (a & u == 0).
+
+        Small cubes enumerate submasks of u and look them up,
+        large ones are found by scanning all codes with mask/value test.
+        """
+        assert self.is_binary
+        assert a & u == 0
+        k = bin(u).count("1")
+        if (1 << k) * len(self).bit_length() < len(self):
+            dtype = self.codes.dtype.type
+            inds = self.indices(submasks(u, dtype=dtype) | dtype(a))
+            # a | s is increasing in s (a & u == 0), so sorted
+            return inds[inds >= 0]
+
+        dtype = self.codes.dtype.type
+        notu = dtype(((1 << self.n) - 1) ^ u)
+        return np.flatnonzero((self.codes & notu) == dtype(a))
+
+    @property
+    def index_map(self):
+        """Point (tuple) -> index mapping view."""
+        if self._index_map is None:
+            self._index_map = PackedPointsIndex(self)
+        return self._index_map
+
+    # ========================================
+    # transformations
+    # ========================================
+
+    def flip_mask(self, direction):
+        """Code mask of the coordinates flipped by direction (-1)."""
+        mask = 0
+        for d in direction:
+            mask = (mask << 1) | (d == -1)
+        return mask
+
+    def flip_codes(self, codes, direction):
+        assert self.is_binary
+        mask = self.flip_mask(direction)
+        if self.codes.dtype != object:
+            mask = self.codes.dtype.type(mask)
+        return np.asarray(codes, dtype=self.codes.dtype) ^ mask
+
+    def reoriented(self, direction):
+        """Points with coordinates v -> 1 - v where direction is -1."""
+        if direction is None:
+            return self
+        assert len(direction) == self.n
+        if not self.is_binary and self.matrix.size:
+            raise ValueError("only binary points can be reoriented")
+        return self.from_codes(self.flip_codes(self.codes, direction), self.n)
+
+    # ========================================
+    # tuple view
+    # ========================================
+
+    def __len__(self):
+        return len(self.codes)
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [tuple(row) for row in self.matrix[i].tolist()]
+        return tuple(self.matrix[i].tolist())
+
+    def __iter__(self, chunk=4096):
+        for start in range(0, len(self), chunk):
+            yield from map(tuple, self.matrix[start:start+chunk].tolist())
+
+    def __contains__(self, pt):
+        return self.find(pt) >= 0
+
+    def __repr__(self):
+        offset = f" offset={self.offset}" if self.offset else ""
+        return (
+            f"<PackedPoints N={len(self)} n={self.n} radix={self.radix}"
+            f"{offset}>"
+        )
+
+
+class PackedPointsIndex(Mapping):
+    """Thin point (tuple) -> index view of PackedPoints."""
+
+    def __init__(self, points: PackedPoints):
+        self.points = points
+
+    def __getitem__(self, pt):
+        i = self.points.find(pt)
+        if i < 0:
+            raise KeyError(pt)
+        return i
+
+    def __contains__(self, pt):
+        return self.points.find(pt) >= 0
+
+    def __iter__(self):
+        return iter(self.points)
+
+    def __len__(self):
+        return len(self.points)
+
+    def items(self):
+        return zip(self.points, range(len(self.points)))
+
+
+def submasks(u: int, dtype=np.uint64):
+    """All submasks of u in increasing order."""
+    subs = np.zeros(1, dtype=dtype)
+    bit = 1
+    while bit <= u:
+        if u & bit:
+            subs = np.concatenate((subs, subs + dtype(bit)))
+        bit <<= 1
+    return subs
+
+
+# DenseSet bitmap: bit x of the (little-endian) 64-bit words is set
+# iff x is in the set, the words are exposed via pickling state
+# (n, (2**n, nwords, bytes)) of subsets (pinned in pyproject.toml).
+
+def denseset_state(d: DenseSet):
+    """Bitmap words of the DenseSet, checking the state layout."""
+    state = d.__getstate__()
+    try:
+        n, (size, nwords, data) = state
+        ok = n == d.n and size == 2**n and nwords == (size + 63) // 64 \
+            and isinstance(data, bytes) and len(data) == 8 * nwords
+    except (TypeError, ValueError):
+        ok = False
+    if not ok:
+        raise NotImplementedError(
+            "unsupported DenseSet state layout, check the subsets version"
+        )
+    return np.frombuffer(data, dtype="<u8")
+
+
+def denseset_codes(d: DenseSet, chunk=2**20):
+    """Sorted uint64 array of the elements of the DenseSet
+    (same as get_support(), without creating Python integers)."""
+    words = denseset_state(d)
+    nonzero = np.flatnonzero(words)
+    res = []
+    for start in range(0, len(nonzero), chunk):
+        pos = nonzero[start:start+chunk]
+        bits = np.unpackbits(
+            words[pos].view(np.uint8), bitorder="little",
+        ).reshape(-1, 64)
+        rows, cols = np.nonzero(bits)
+        res.append(pos[rows].astype(np.uint64) * np.uint64(64) + cols)
+    if not res:
+        return np.zeros(0, dtype=np.uint64)
+    return np.concatenate(res).astype(np.uint64)
+
+
+def denseset_from_codes(codes, n: int) -> DenseSet:
+    """DenseSet of dimension n with the given elements."""
+    size = 2**n
+    nwords = (size + 63) // 64
+    codes = np.asarray(codes, dtype=np.uint64)
+    if len(codes) and int(codes.max()) >= size:
+        raise ValueError(f"code out of range for n={n}")
+    words = np.zeros(nwords, dtype="<u8")
+    np.bitwise_or.at(
+        words,
+        (codes >> np.uint64(6)).astype(np.intp),
+        np.left_shift(np.uint64(1), codes & np.uint64(63)),
+    )
+    d = DenseSet(n)
+    denseset_state(d)
+    d.__setstate__((n, (size, nwords, words.tobytes())))
+    return d
+
+
+def as_matrix(points):
+    """(N, n) matrix of PackedPoints or of an array-like of points."""
+    if isinstance(points, PackedPoints):
+        return points.matrix
+    matrix = np.asarray(points)
+    if matrix.ndim == 1:
+        matrix = matrix.reshape(1, -1)
+    return matrix
+
+
+def as_codes(points, n=None):
+    """Packed codes of binary PackedPoints, of an (N, n) 0/1 matrix,
+    or given codes (1-d array) as is."""
+    if isinstance(points, PackedPoints):
+        if not points.is_binary:
+            raise ValueError("packed codes are used for binary points only")
+        return points.codes
+
+    arr = np.asarray(points)
+    if arr.ndim == 1:
+        return arr
+
+    assert n is None or arr.shape[1] == n
+    dtype = np.uint64 if arr.shape[1] <= 64 else object
+    codes = np.zeros(arr.shape[0], dtype=dtype)
+    for i in range(arr.shape[1]):
+        codes = codes * 2 + arr[:, i].astype(dtype)
+    return codes
+
+
+def points_dimension(points):
+    if isinstance(points, PackedPoints):
+        return points.n
+    shape = np.shape(points)
+    if len(shape) != 2:
+        raise ValueError("dimension must be given for packed codes")
+    return shape[1]
@@ -0,0 +1,239 @@
+"""
+Caches of oracle answers exploiting monotonicity of separability:
+subsets of a feasible (separable) set of bad points are feasible
+(by the same inequality), supersets of an infeasible set are infeasible.
+
+Sets of exclude indices are indexed by per-point bitmasks (Python ints)
+of cache slots: supersets of a query = AND of the slot masks of its points.
+Infeasible sets are bucketed by their minimal element
+(a subset of a query has its minimal element in the query).
+All parts are bounded and evicted in LRU order.
+
+Lookup costs grow with the cache size: a feasible lookup ANDs the
+slot masks of the query's points, O(|query| * max_size / 64) word
+operations; an infeasible lookup tests the stored sets bucketed under
+the query's points, O(max_size) subset tests in the worst case
+(about 1ms in total for max_size=2**12, see --lp-cache-size).
+"""
+
+from collections import OrderedDict
+
+import numpy as np
+
+from monolearn.SparseSet import SparseSet
+
+
+class SupersetIndex:
+    """Bounded LRU collection of (set of indices, meta)
+    with lookup of a stored superset of a given set."""
+
+    def __init__(self, max_size):
+        assert max_size >= 1
+        self.max_size = int(max_size)
+        self.entries = OrderedDict()  # slot -> (vec, meta), LRU order
+        self.slots_by_point = {}  # point -> mask of slots
+        self.free_slots = list(range(self.max_size - 1, -1, -1))
+
+    def __len__(self):
+        return len(self.entries)
+
+    def lookup(self, vec):
+        """Meta of a stored superset of vec (or None)."""
+        slots = self.slots_by_point
+        mask = -1
+        for i in vec:
+            mask &= slots.get(i, 0)
+            if not mask:
+                return
+        slot = (mask & -mask).bit_length() - 1
+        self.entries.move_to_end(slot)
+        return self.entries[slot][1]
+
+    def add(self, vec, meta):
+        if not self.free_slots:
+            self._evict()
+        slot = self.free_slots.pop()
+        self.entries[slot] = vec, meta
+
+        bit = 1 << slot
+        slots = self.slots_by_point
+        for i in vec:
+            slots[i] = slots.get(i, 0) | bit
+
+    def _evict(self):
+        slot, (vec, _) = self.entries.popitem(last=False)
+        bit = 1 << slot
+        slots = self.slots_by_point
+        for i in vec:
+            slots[i] &= ~bit
+            if not slots[i]:
+                del slots[i]
+        self.free_slots.append(slot)
+
+
+class LRUDict(OrderedDict):
+    """Dict keeping the max_size most recently used items
+    (an exact cache of oracle answers, see Oracle._cache)."""
+
+    def __init__(self, max_size=2**16):
+        super().__init__()
+        assert max_size >= 1
+        self.max_size = int(max_size)
+
+    def __getitem__(self, key):
+        value = super().__getitem__(key)
+        self.move_to_end(key)
+        return value
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if len(self) > self.max_size:
+            self.popitem(last=False)
+
+
+class MonotoneQueryCache:
+    def __init__(self, max_size=2**12):
+        assert max_size >= 1
+        self.max_size = int(max_size)
+
+        self.feasible = SupersetIndex(self.max_size)
+
+        self.infeasible = OrderedDict()  # vec -> mask, LRU order
+        self.infeasible_by_min = {}  # min point -> {vec: mask}
+
+        self.n_hits_feasible = 0
+        self.n_hits_infeasible = 0
+        self.n_misses = 0
+
+    def __len__(self):
+        return len(self.feasible) + len(self.infeasible)
+
+    @staticmethod
+    def to_mask(vec: SparseSet):
+        mask = 0
+        for i in vec:
+            mask |= 1 << i
+        return mask
+
+    def lookup(self, vec: SparseSet):
+        """Returns (True, meta), (False, None) or None if unknown."""
+        ret = self.lookup_feasible(vec)
+        if ret is None:
+            ret = self.lookup_infeasible(vec)
+        if ret is None:
+            self.n_misses += 1
+        return ret
+
+    def lookup_feasible(self, vec: SparseSet):
+        meta = self.feasible.lookup(vec)
+        if meta is None:
+            return
+        self.n_hits_feasible += 1
+        return True, meta
+
+    def lookup_infeasible(self, vec: SparseSet):
+        qmask = self.to_mask(vec)
+        for i in vec:
+            bucket = self.infeasible_by_min.get(i)
+            if not bucket:
+                continue
+            for sub, mask in bucket.items():
+                if mask & ~qmask == 0:
+                    self.infeasible.move_to_end(sub)
+                    self.n_hits_infeasible += 1
+                    return False, None
+
+    def add(self, vec: SparseSet, is_feasible: bool, meta=None):
+        if not vec:
+            return
+        if is_feasible:
+            self.feasible.add(vec, meta)
+        else:
+            self.add_infeasible(vec)
+
+    def add_infeasible(self, vec: SparseSet):
+        if vec in self.infeasible:
+            return
+        if len(self.infeasible) >= self.max_size:
+            self._evict_infeasible()
+        mask = self.to_mask(vec)
+        self.infeasible[vec] = mask
+        self.infeasible_by_min.setdefault(vec[0], {})[vec] = mask
+
+    def _evict_infeasible(self):
+        vec, _ = self.infeasible.popitem(last=False)
+        bucket = self.infeasible_by_min[vec[0]]
+        del bucket[vec]
+        if not bucket:
+            del self.infeasible_by_min[vec[0]]
+
+    def stat(self):
+        return (
+            f"cache hits {self.n_hits_feasible} feasible"
+            f" + {self.n_hits_infeasible} infeasible,"
+            f" misses {self.n_misses},"
+            f" stored {len(self.feasible)} feasible"
+            f" + {len(self.infeasible)} infeasible"
+        )
+
+
+class CutPool:
+    """Found inequalities with the sets of exclude points they cut
+    (computed in one vectorized pass over the exclude points).
+
+    A query is answered by any inequality cutting all its points.
+    """
+
+    def __init__(self, exclude, max_size=2**12):
+        self.exclude = exclude
+        self.index = SupersetIndex(max_size)
+        self.known = set()
+
+        self.n_hits = 0
+        self.n_misses = 0
+
+    def __len__(self):
+        return len(self.index)
+
+    def cut_set(self, ineq) -> SparseSet:
+        return cut_set(ineq, self.exclude)
+
+    def add(self, ineq, cut: SparseSet = None):
+        """Add the inequality (cut = cut_set(ineq) if precomputed).
+
+        Returns its cut set, or None if the inequality is known already
+        or its cut set is covered by a stored one.
+        """
+        if ineq in self.known:
+            return
+        if cut is None:
+            cut = self.cut_set(ineq)
+        if self.index.lookup(cut) is not None:
+            return
+        if len(self.index) >= self.index.max_size:
+            _, oldest = next(iter(self.index.entries.values()))
+            self.known.discard(oldest)
+        self.known.add(ineq)
+        self.index.add(cut, ineq)
+        return cut
+
+    def lookup(self, vec: SparseSet):
+        """Returns (True, ineq) or None."""
+        ineq = self.index.lookup(vec)
+        if ineq is None:
+            self.n_misses += 1
+            return
+        self.n_hits += 1
+        return True, ineq
+
+    def stat(self):
+        return (
+            f"cut pool hits {self.n_hits}, misses {self.n_misses},"
+            f" stored {len(self)} inequalities"
+        )
+
+
+def cut_set(ineq, exclude) -> SparseSet:
+    """Indices of the exclude points removed by the inequality."""
+    return SparseSet(np.flatnonzero(ineq.violated_mask(exclude)))
@@ -0,0 +1,139 @@
+"""
+Local on-disk cache of solved instances,
+keyed by the instance fingerprint (ConstraintPool.fingerprint),
+so that a set solved before (in any folder) is not learned again.
+
+Layout:
+    <root>/<fingerprint>/system.bz2  learned constraint pool (LowerSetLearn file)
+    <root>/<fingerprint>/best        best subset found (same format as outputs)
+    <root>/<fingerprint>/info.json   size, optimality and source of the subset
+"""
+
+import os
+import json
+import shutil
+import logging
+
+from collections import namedtuple
+
+
+CachedResult = namedtuple(
+    "CachedResult", ["constraints", "optimal", "source", "sysfile"]
+)
+
+
+class ResultCache:
+    ENV = "OPTIMODEL_CACHE"
+
+    log = logging.getLogger(f"{__name__}:ResultCache")
+
+    def __init__(self, root: str = None):
+        if root is None:
+            root = self.default_root()
+        self.root = root
+
+    @classmethod
+    def default_root(cls):
+        root = os.environ.get(cls.ENV)
+        if root:
+            return root
+        cache_home = os.environ.get("XDG_CACHE_HOME") \
+            or os.path.join(os.path.expanduser("~"), ".cache")
+        return os.path.join(cache_home, "optimodel")
+
+    def path(self, fingerprint):
+        return os.path.join(self.root, fingerprint)
+
+    def lookup(self, fingerprint) -> CachedResult:
+        path = self.path(fingerprint)
+        try:
+            with open(os.path.join(path, "info.json")) as f:
+                info = json.load(f)
+            constraints = read_constraints(os.path.join(path, "best"))
+        except FileNotFoundError:
+            return
+        except (ValueError, OSError) as err:
+            self.log.warning(f"corrupted cache entry {path}: {err}")
+            return
+
+        if len(constraints) != info["size"]:
+            self.log.warning(f"corrupted cache entry {path}: size mismatch")
+            return
+
+        sysfile = os.path.join(path, "system.bz2")
+        return CachedResult(
+            constraints=constraints,
+            optimal=info["optimal"],
+            source=info["source"],
+            sysfile=sysfile if os.path.isfile(sysfile) else None,
+        )
+
+    def store(self, fingerprint, constraints, optimal, source, sysfile=None):
+        """Store the result, unless a better one is stored already."""
+        prev = self.lookup(fingerprint)
+        if prev is not None and (
+            (len(prev.constraints), not prev.optimal)
+            <= (len(constraints), not optimal)
+        ):
+            self.log.info(
+                f"cache {fingerprint}: keeping stored {len(prev.constraints)}"
+                f" constraints (optimal? {prev.optimal})"
+            )
+            return False
+
+        path = self.path(fingerprint)
+        try:
+            os.makedirs(path, exist_ok=True)
+            if sysfile and os.path.isfile(sysfile):
+                copy_atomic(sysfile, os.path.join(path, "system.bz2"))
+
+            tmp = os.path.join(path, f"best.{os.getpid()}.tmp")
+            write_constraints(tmp, constraints)
+            os.replace(tmp, os.path.join(path, "best"))
+
+            tmp = os.path.join(path, f"info.json.{os.getpid()}.tmp")
+            with open(tmp, "w") as f:
+                json.dump(dict(
+                    size=len(constraints),
+                    optimal=bool(optimal),
+                    source=source,
+                ), f)
+            os.replace(tmp, os.path.join(path, "info.json"))
+        except OSError as err:
+            self.log.warning(f"could not store result in cache {path}: {err}")
+            return False
+
+        self.log.info(
+            f"cache {fingerprint}: stored {len(constraints)}"
+            f" constraints (optimal? {optimal})"
+        )
+        return True
+
+
+def copy_atomic(src, dst):
+    tmp = f"{dst}.{os.getpid()}.tmp"
+    shutil.copyfile(src, tmp)
+    os.replace(tmp, dst)
+
+
+def write_constraints(filename, constraints):
+    with open(filename, "w") as f:
+        print(len(constraints), file=f)
+        for cons in constraints:
+            print(*cons, file=f)
+
+
+def read_constraints(filename):
+    with open(filename) as f:
+        num = int(f.readline())
+        return [
+            tuple(map(parse_number, f.readline().split()))
+            for _ in range(num)
+        ]
+
+
+def parse_number(s):
+    try:
+        return int(s)
+    except ValueError:
+        return float(s)
@@ -0,0 +1,56 @@
+"""
+Read-only NumPy arrays shared with worker processes.
+"""
+
+from multiprocessing import shared_memory
+
+import numpy as np
+
+
+class SharedArray:
+    """NumPy array placed in shared memory.
+
+    Pickles by reference (name, shape, dtype), so that it can be passed
+    to worker processes (any start method) without copying the data.
+    The creating process owns the memory and should call unlink()
+    (or use as a context manager).
+    """
+
+    def __init__(self, array: np.ndarray):
+        array = np.ascontiguousarray(array)
+        if array.dtype == object:
+            raise TypeError("object arrays can not be shared")
+        self.shape = array.shape
+        self.dtype = array.dtype.str
+        self.shm = shared_memory.SharedMemory(
+            create=True, size=max(1, array.nbytes),
+        )
+        self.owner = True
+        self.array = self._view()
+        self.array[...] = array
+        self.array.flags.writeable = False
+
+    def _view(self):
+        return np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf)
+
+    def __getstate__(self):
+        return self.shm.name, self.shape, self.dtype
+
+    def __setstate__(self, state):
+        name, self.shape, self.dtype = state
+        self.shm = shared_memory.SharedMemory(name=name)
+        self.owner = False
+        self.array = self._view()
+        self.array.flags.writeable = False
+
+    def unlink(self):
+        del self.array
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.unlink()
@@ -0,0 +1,101 @@
+"""
+Append-only journal of completed ShiftLearn shifts,
+so that an interrupted run can be resumed.
+
+The file is a sequence of pickled records:
+a header dict(version=..., fingerprint=...) identifying the instance
+(point sets and learn chain), then one (origin, core, solutions) tuple
+per completed shift. Each record is flushed, but fsync'ed only
+once SYNC_INTERVAL seconds passed since the last fsync (and on closing),
+so a crash of the machine loses at most the last records of that
+interval; their shifts are simply recomputed on resume.
+A record cut by a crash is dropped (and truncated away) on loading.
+"""
+
+import os
+import time
+import pickle
+import logging
+
+
+class ShiftJournal:
+    log = logging.getLogger(f"{__name__}:ShiftJournal")
+
+    VERSION = 1
+    SYNC_INTERVAL = 1.0  # seconds
+
+    def __init__(self, filename, fingerprint, sync_interval=SYNC_INTERVAL):
+        self.filename = filename
+        self.fingerprint = fingerprint
+        self.sync_interval = sync_interval
+        self.file = None
+        self.last_sync = 0.0
+
+    def load(self):
+        """Yields the (origin, core, solutions) records of a previous run
+        of the same instance. The journal is open for appending afterwards.
+
+        A journal of a different instance is moved aside (.stale).
+        """
+        offset = 0
+        if os.path.isfile(self.filename):
+            with open(self.filename, "rb") as f:
+                header = self._read(f)
+                if header == self._header():
+                    offset = f.tell()
+                    while True:
+                        record = self._read(f)
+                        if record is None:
+                            break
+                        offset = f.tell()
+                        yield record
+                else:
+                    stale = self.filename + ".stale"
+                    self.log.warning(
+                        f"journal {self.filename} is of another instance"
+                        f" or version, moving it to {stale}"
+                    )
+                    os.replace(self.filename, stale)
+
+        self.file = open(self.filename, "ab")
+        if offset:
+            # drop a partially written record
+            self.file.truncate(offset)
+        else:
+            self.file.truncate(0)
+            self._write(self._header())
+            self._sync()
+
+    def append(self, origin, core, solutions):
+        self._write((origin, core, solutions))
+        if time.monotonic() - self.last_sync >= self.sync_interval:
+            self._sync()
+
+    def close(self):
+        if self.file is not None:
+            self._sync()
+            self.file.close()
+            self.file = None
+
+    def _header(self):
+        return dict(version=self.VERSION, fingerprint=self.fingerprint)
+
+    def _read(self, f):
+        try:
+            return pickle.load(f)
+        except EOFError:
+            return
+        except (pickle.UnpicklingError, ValueError, AttributeError) as err:
+            self.log.warning(
+                f"journal {self.filename}: dropping a truncated record"
+                f" at {f.tell()} ({err})"
+            )
+            return
+
+    def _write(self, record):
+        pickle.dump(record, self.file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.file.flush()
+
+    def _sync(self):
+        os.fsync(self.file.fileno())
+        self.last_sync = time.monotonic()
@@ -1,121 +1,433 @@
 import os
+import time
+import threading
+import hashlib
 import logging
 import multiprocessing
-from collections import defaultdict
+from contextlib import contextmanager
 from functools import reduce
 
 from binteger import Bin
 
-from subsets import DenseSet
 from monolearn.SparseSet import SparseSet
 
 from monolearn import Modules as LearnModules
 from monolearn.utils import TimeStat
 
 from optimodel.constraint_pool import ConstraintPool
-from optimodel.lp_oracle import LPbasedOracle
+from optimodel.packed_points import (
+    PackedPoints, denseset_codes, denseset_from_codes,
+)
+from optimodel.lp_oracle import LPbasedOracle, OraclePoints
+from optimodel.batch_learn import BatchLevelLearn  # registers the module
+from optimodel.shared import SharedArray
+from optimodel.shift_journal import ShiftJournal
+from optimodel.shift_queue import ShiftQueue
+from optimodel.shift_merge import ShiftMerge
 
 from optimodel.inequality import Inequality
 
-# multiprocessing is nuts
-HACK = None
-
-
-def worker(shift):
-    return HACK.worker(shift)
-
 
 class ShiftLearn:
+    """Learning a generic (binary) set through all its shifts:
+    for each exclude point, the set is reoriented so that the point
+    becomes the origin, and the removable lower set is learned
+    as an upper-set problem (see process_origin_get_subpool).
+
+    Shifts are independent and can be processed in worker processes
+    (process_all_shifts(threads=...)); workers receive only the shifts,
+    the include/exclude codes are shared read-only (SharedArray).
+
+    Completed shifts are recorded in a journal in path (ShiftJournal);
+    with resume=True, a rerun on the same instance skips them.
+
+    Shifts whose subproblems are identical (as seen from their origins,
+    e.g. by XOR symmetries of the set) are learned only once
+    (see subproblem_fingerprint), the result is mapped to each origin.
+
+    Subproblems are processed from the most expensive one
+    (estimated by subproblem_cost) so that the long ones do not
+    finish last on an otherwise idle pool. With time_budget (seconds),
+    learning of a shift stops after that time: its partial system is
+    saved and the shift is left for a rerun (resume).
+
+    With distributed=True, several processes (possibly on different
+    machines) sharing path claim subproblems from a work queue there
+    (ShiftQueue) instead of using the journal; with wait=True,
+    the process waits for all subproblems and merges all the results,
+    with wait=False it only helps while there is unclaimed work.
+
+    Results are merged into the pool's system as they arrive
+    (ShiftMerge); at most max_pending incomplete vectors are kept in
+    memory, the rest is spilled to disk and merged by compose().
+    """
     log = logging.getLogger(__name__)
 
-    def __init__(self, pool, path, learn_chain):
+    START_METHODS = ("fork", "spawn", "forkserver")
+
+    def __init__(
+        self, pool, path, learn_chain,
+        chunk_size=1, start_method=None, resume=True, time_budget=None,
+        distributed=False, wait=True, lease_time=600, poll_interval=5,
+        max_pending=10**6,
+    ):
         self.pool = pool
         if self.pool.is_upper or self.pool.direction is not None:
             # convert to generic? tool
             raise ValueError(
                 "ShiftLearn is only applicable to generic non-shifted sets"
             )
-
-        # NB: for now, only binary sets are supported!
-        # otherwise, need to compute lower/upper sets inside given sets
-        self.include = DenseSet(
-            self.pool.n, [Bin(v).int for v in self.pool.include])
-        self.exclude = DenseSet(
-            self.pool.n, [Bin(v).int for v in self.pool.exclude])
+        if start_method not in (None,) + self.START_METHODS:
+            raise ValueError(f"unknown start method {start_method!r}")
 
         self.path = path
         self.learn_chain = learn_chain
+        self.chunk_size = max(1, int(chunk_size))
+        self.start_method = start_method
+        self.resume = resume
+        self.time_budget = time_budget
+        self.distributed = distributed
+        self.wait = wait
+        self.lease_time = lease_time
+        self.poll_interval = poll_interval
+        self.max_pending = max_pending
+        self.merger = None
         assert os.path.isdir(self.path)
+        self._init_sets()
+
+    @classmethod
+    def from_shared(
+        cls, n, include, exclude, path, learn_chain, time_budget=None,
+    ):
+        """Worker-side instance on shared (sorted) include/exclude codes."""
+        self = cls.__new__(cls)
+        self.pool = OraclePoints(
+            is_upper=False,
+            include=PackedPoints.from_codes(include.array, n, is_sorted=True),
+            exclude=PackedPoints.from_codes(exclude.array, n, is_sorted=True),
+        )
+        self.shared = include, exclude  # keep the shared memory attached
+        self.path = path
+        self.learn_chain = learn_chain
+        self.time_budget = time_budget
+        self._init_sets()
+        return self
+
+    def _init_sets(self):
+        # NB: for now, only binary sets are supported!
+        # otherwise, need to compute lower/upper sets inside given sets
+        self.include = denseset_from_codes(self.pool.include.codes, self.pool.n)
+        self.exclude = denseset_from_codes(self.pool.exclude.codes, self.pool.n)
 
     def process_all_shifts(self, threads=1):
         if self.pool.system.is_complete:
             self.log.warning("system is complete, nothign to learn...")
             return
 
-        self.counts = defaultdict(int)
-        self.core = {}  # sanity check
-        self.solutions = {}
+        self.merger = ShiftMerge(
+            self.pool.system,
+            self.path,
+            max_pending=self.max_pending,
+            # other processes may be merging in path
+            clean=not self.distributed,
+        )
 
-        if threads == 1:
-            for new_origin in self.exclude.to_Bins():
-                new_origin = new_origin.tuple
-                self.log.info(
-                    f"processing reorientation from {new_origin}"
-                )
-                core, solutions = self.process_origin(new_origin)
-
-                self.log.info(f"merging solutions for origin {new_origin}")
-                for vec in solutions:
-                    if vec not in self.core:
-                        self.core.setdefault(vec, core[vec])
-                    assert self.core[vec] == core[vec]
-                    self.counts[vec] += 1
-                self.solutions.update(solutions)
+        self.unfinished = []
+        if self.distributed:
+            self.process_distributed(threads)
         else:
-            shifts = list(self.exclude.to_Bins())
-
-            global HACK
-            HACK = self
-            p = multiprocessing.Pool(processes=threads)
-            for result in p.imap_unordered(worker, shifts):
-                new_origin, core, solutions, time_stat = result
-
-                # merge time logs
-                for name, stat in time_stat.items():
-                    TimeStat.Stat[name].merge(stat)
-
-                self.log.info(f"merging solutions of new_origin {new_origin}")
-                for vec in solutions:
-                    if vec not in self.core:
-                        self.core.setdefault(vec, core[vec])
-                    assert self.core[vec] == core[vec]
-                    self.counts[vec] += 1
-                self.solutions.update(solutions)
+            self.process_journaled(threads)
+
+        if self.unfinished:
+            self.log.warning(
+                f"{len(self.unfinished)} shifts exceeded the time budget"
+                f" of {self.time_budget}s and are left unfinished"
+                " (their partial systems are saved, rerun to continue)"
+            )
+
+    def process_journaled(self, threads):
+        journal = ShiftJournal(
+            os.path.join(self.path, "journal"),
+            fingerprint=self.pool.fingerprint(
+                kind="shifts", learn_chain=self.learn_chain,
+            ),
+        )
+        if not self.resume and os.path.isfile(journal.filename):
+            os.remove(journal.filename)
+
+        done = set()
+        for new_origin, core, solutions in journal.load():
+            self.merge_origin(new_origin, core, solutions)
+            done.add(new_origin)
+
+        shifts = [shift.tuple for shift in self.exclude.to_Bins()]
+        if done:
+            shifts = [shift for shift in shifts if shift not in done]
+            self.log.info(
+                f"resuming: {len(done)} shifts done (journal),"
+                f" {len(shifts)} left"
+            )
+
+        groups, costs, subproblems = self.group_shifts(shifts)
+        progress = ShiftProgress(
+            total_cost=sum(
+                cost * len(origins) for origins, cost in zip(groups, costs)
+            ),
+            total=len(shifts),
+        )
+        try:
+            if threads == 1:
+                for origins, cost, subproblem in zip(
+                    groups, costs, subproblems,
+                ):
+                    self.log.info(
+                        f"processing reorientation from {origins[0]}"
+                    )
+                    learned = self.try_learn_subproblem(
+                        origins[0], subproblem,
+                    )
+                    self.finish_group(journal, origins, learned)
+                    progress.update(cost * len(origins), len(origins))
+            else:
+                group_of = {
+                    origins[0]: (origins, cost)
+                    for origins, cost in zip(groups, costs)
+                }
+                tasks = [
+                    (origins[0], subproblem)
+                    for origins, subproblem in zip(groups, subproblems)
+                ]
+                for new_origin, learned, time_stat in self.process_parallel(
+                    tasks, threads,
+                ):
+                    merge_time_stat(time_stat)
+                    origins, cost = group_of[new_origin]
+                    self.finish_group(journal, origins, learned)
+                    progress.update(cost * len(origins), len(origins))
+        finally:
+            journal.close()
+
+    def process_distributed(self, threads):
+        queue = ShiftQueue(
+            os.path.join(self.path, "queue_" + self.pool.fingerprint(
+                kind="shifts", learn_chain=self.learn_chain,
+            )),
+            lease_time=self.lease_time,
+            time_budget=self.time_budget,
+        )
+        shifts = [shift.tuple for shift in self.exclude.to_Bins()]
+        groups, costs, subproblems = self.group_shifts(shifts)
+        keys = [Bin(origins[0]).hex for origins in groups]
+        group_of = dict(zip(keys, zip(groups, costs)))
+        subproblem_of = dict(zip(keys, subproblems))
+        del subproblems
+        progress = ShiftProgress(
+            total_cost=sum(
+                cost * len(origins) for origins, cost in zip(groups, costs)
+            ),
+            total=len(shifts),
+        )
+        self.log.info(
+            f"distributed: {len(keys)} subproblems in queue {queue.root}"
+        )
+
+        finished = set()
+        running = {}
+        event = threading.Event()
+
+        def mark_finished(key):
+            finished.add(key)
+            subproblem_of.pop(key, None)
+            origins, cost = group_of[key]
+            progress.update(cost * len(origins), len(origins))
+
+        with self.worker_pool(threads) as worker_pool, queue:
+            pos = 0
+            while len(finished) < len(keys):
+                event.clear()
+                for key, result in list(running.items()):
+                    if result.ready():
+                        del running[key]
+                        _, learned, time_stat = result.get()
+                        merge_time_stat(time_stat)
+                        if self.finish_claimed(
+                            queue, key, group_of[key][0], learned,
+                        ):
+                            mark_finished(key)
+
+                # scan for work, from the most expensive subproblem
+                claimed = None
+                while pos < len(keys) and len(running) < threads:
+                    key = keys[pos]
+                    pos += 1
+                    if key in finished or key in running:
+                        continue
+                    if queue.is_finished(key):
+                        mark_finished(key)
+                    elif queue.claim(key):
+                        claimed = key
+                        break
+
+                if claimed is not None:
+                    origin = group_of[claimed][0][0]
+                    subproblem = subproblem_of[claimed]
+                    self.log.info(f"claimed reorientation from {origin}")
+                    if worker_pool is None:
+                        learned = self.try_learn_subproblem(
+                            origin, subproblem,
+                        )
+                        if self.finish_claimed(
+                            queue, claimed, group_of[claimed][0], learned,
+                        ):
+                            mark_finished(claimed)
+                    else:
+                        running[claimed] = worker_pool.apply_async(
+                            _shift_worker, ((origin, subproblem),),
+                            callback=lambda _: event.set(),
+                            error_callback=lambda _: event.set(),
+                        )
+                    continue
+
+                if len(finished) == len(keys):
+                    break
+                if pos == len(keys):
+                    # the rest is leased by others (or running here)
+                    if not running and not self.wait:
+                        break
+                    pos = 0
+                event.wait(self.poll_interval if pos == 0 else None)
+
+        if not self.wait:
+            self.log.info(
+                "no more unclaimed subproblems, leaving the rest"
+                " to the other processes"
+            )
+            return
+
+        for key in keys:
+            records = queue.load(key)
+            if records is None:
+                self.unfinished.extend(group_of[key][0])
+                continue
+            for new_origin, core, solutions in records:
+                self.merge_origin(new_origin, core, solutions)
+
+    def finish_claimed(self, queue, key, origins, learned):
+        """Store the result of a claimed subproblem (False if the lease
+        was lost to another process, which then finishes it)."""
+        if learned is None:
+            # counted as unfinished when merging
+            return queue.give_up(key)
+        return queue.complete(key, [
+            (new_origin, *self.extract_solutions(learned, new_origin))
+            for new_origin in origins
+        ])
+
+    @TimeStat.log
+    def group_shifts(self, shifts):
+        """Groups of shifts with the same subproblem (fingerprint)
+        and their estimated costs, the most expensive first;
+        the first shift of each group is the one to learn.
+
+        Also returns the subproblem (origin_subproblem) of each group's
+        first shift, to be passed to learn_subproblem.
+        """
+        groups = {}
+        costs = {}
+        subproblems = {}
+        for origin in shifts:
+            subproblem = self.origin_subproblem(origin)
+            good, removable, bad = subproblem
+            fingerprint = self.subproblem_fingerprint(good, bad)
+            if fingerprint not in groups:
+                groups[fingerprint] = []
+                costs[fingerprint] = self.subproblem_cost(*subproblem)
+                subproblems[fingerprint] = subproblem
+            groups[fingerprint].append(origin)
+        if len(groups) < len(shifts):
+            self.log.info(
+                f"{len(shifts)} shifts have {len(groups)} distinct"
+                " subproblems"
+            )
+        order = sorted(groups, key=costs.__getitem__, reverse=True)
+        return (
+            [groups[fp] for fp in order],
+            [costs[fp] for fp in order],
+            [subproblems[fp] for fp in order],
+        )
+
+    def finish_group(self, journal, origins, learned):
+        if learned is None:
+            self.unfinished.extend(origins)
+            return
+        for new_origin in origins:
+            core, solutions = self.extract_solutions(learned, new_origin)
+            journal.append(new_origin, core, solutions)
+            self.merge_origin(new_origin, core, solutions)
+
+    def process_parallel(self, tasks, threads):
+        """Yields (origin, learned, time_stat) from worker processes
+        (in completion order) for (origin, subproblem) tasks."""
+        with self.worker_pool(threads) as worker_pool:
+            yield from worker_pool.imap_unordered(
+                _shift_worker, tasks, chunksize=self.chunk_size,
+            )
+
+    @contextmanager
+    def worker_pool(self, threads):
+        """Pool of worker processes (None if threads == 1)."""
+        if threads == 1:
+            yield None
+            return
+
+        context = multiprocessing.get_context(self.start_method)
+        shared = (
+            SharedArray(self.pool.include.codes),
+            SharedArray(self.pool.exclude.codes),
+        )
+        self.log.info(
+            f"starting {threads} worker processes"
+            f" ({context.get_start_method()},"
+            f" chunks of {self.chunk_size})"
+        )
+        try:
+            with context.Pool(
+                processes=threads,
+                initializer=_shift_worker_init,
+                initargs=(
+                    self.pool.n, *shared, self.path, self.learn_chain,
+                    self.time_budget,
+                ),
+            ) as worker_pool:
+                yield worker_pool
+        finally:
+            for arr in shared:
+                arr.unlink()
+
+    def merge_origin(self, new_origin, core, solutions):
+        self.log.info(f"merging solutions for origin {new_origin}")
+        self.merger.add(core, solutions)
 
     @TimeStat.log
     def compose(self):
         self.log.info("composing")
-        for vec, ineq in self.solutions.items():
-            if self.counts[vec] == 2**self.core[vec].weight:
-                self.pool.system.add_lower(vec, meta=ineq, is_prime=True)
+        if self.merger is not None:
+            self.merger.finish()
+            self.log.info(
+                f"{self.merger.n_promoted} inequalities added to the system"
+            )
         self.pool.system.save()
 
-    def worker(self, shift: Bin):
-        TimeStat.reset_all()
-        core, solutions = self.process_origin(shift)
-        return shift, core, solutions, TimeStat.Stat
-
-    def process_origin(self, new_origin: Bin):
-        subpool = self.process_origin_get_subpool(new_origin)
+    def process_origin(self, new_origin: tuple[int]):
+        learned = self.learn_subproblem(new_origin)
         self.log.info(f"extracting solutions for origin {new_origin}")
-        core, solutions = self.extract_subpool_solutions(subpool)
-        return core, solutions
+        return self.extract_solutions(learned, new_origin)
 
     @TimeStat.log
-    def process_origin_get_subpool(self, origin: tuple[int]):
+    def origin_subproblem(self, origin: tuple[int]):
+        """Sets good, removable, bad of the shift to origin,
+        xored by origin (i.e. as stored in the shift's subpool)."""
         shift = Bin(origin)
-        direction = [-1 if v == 1 else 1 for v in origin]
-        # (1, 0) -> (-1,1)
 
         # xor
         assert len(origin) == self.pool.n
@@ -125,25 +437,77 @@ class ShiftLearn:
         good = s.MinSet()
         s.do_Complement()
         removable = s
-        good.do_Not(shift.int)  # subpool will shift again..
 
         bad = self.exclude.copy()
         bad.do_Not(shift.int)
         bad &= removable
         # bad.do_LowerSet()  # unnecessary?! optimization
-        bad.do_Not(shift.int)  # subpool will shift again..
 
         # good is MinSet of the upper closure
         # bad is what can be removed within this shift
         #          (subset of the removable lower set)
+        return good, removable, bad
+
+    @staticmethod
+    def subproblem_fingerprint(good, bad) -> str:
+        """Shifts with equal fingerprints of their (good, bad) sets
+        (origin_subproblem) have identical subpools (up to the orientation)
+        and hence the same learned constraints."""
+        h = hashlib.blake2b(digest_size=16)
+        for s in (good, bad):
+            support = denseset_codes(s)
+            h.update(len(support).to_bytes(8, "little"))
+            h.update(support.tobytes())
+        return h.hexdigest()
+
+    @staticmethod
+    def subproblem_cost(good, removable, bad) -> float:
+        """Relative cost estimate of learning a subproblem.
+
+        Dominated by the LPs over small subsets of bad (LevelLearn),
+        |bad|^3 ranks the shifts of example_present_ddt by their time
+        with Spearman's correlation 0.96.
+        """
+        return float(bad.get_weight()) ** 3 + 1
+
+    def try_learn_subproblem(self, origin: tuple[int], subproblem=None):
+        """learn_subproblem, None if it exceeded the time budget."""
+        try:
+            return self.learn_subproblem(origin, subproblem)
+        except ShiftBudgetExceeded:
+            self.log.warning(
+                f"shift {Bin(origin).hex} exceeded the time budget"
+                f" of {self.time_budget}s"
+            )
+            return
+
+    @TimeStat.log
+    def learn_subproblem(self, origin: tuple[int], subproblem=None):
+        """Learns the subpool of the shift to origin
+        (subproblem: its origin_subproblem if computed already, modified).
+
+        Returns the learned constraints as seen from origin:
+        list of (removed exclude codes xored by origin, pool's inequality),
+        shared by all shifts with the same subproblem_fingerprint.
+        """
+        shift = Bin(origin)
+        direction = [-1 if v == 1 else 1 for v in origin]
+        # (1, 0) -> (-1,1)
+
+        if subproblem is None:
+            subproblem = self.origin_subproblem(origin)
+        good, removable, bad = subproblem
 
         self.log.info(f"shift {shift.hex} good (MinSet)        {good}")
         self.log.info(f"shift {shift.hex} removable (LowerSet) {removable}")
         self.log.info(f"shift {shift.hex} bad (&LowerSet)      {bad}")
 
+        good.do_Not(shift.int)  # subpool will shift again..
+        bad.do_Not(shift.int)  # subpool will shift again..
+
         subpool = ConstraintPool(
-            include=[v.tuple for v in good.to_Bins()],
-            exclude=[v.tuple for v in bad.to_Bins()],
+            include=PackedPoints.from_DenseSet(good),
+            exclude=PackedPoints.from_DenseSet(bad),
             direction=direction,
             is_upper=True,
             use_point_prec=True,
@@ -151,38 +515,110 @@ class ShiftLearn:
             constraint_class=Inequality,
         )
         self.learn_origin(subpool)
-        return subpool
+        return [
+            (subpool.exclude.codes[list(fset)], cons_pool)
+            for fset, cons_pool, _ in subpool.constraints
+        ]
 
     @TimeStat.log
     def learn_origin(self, subpool):
+        deadline = None
+        if self.time_budget is not None:
+            deadline = time.time() + self.time_budget
         for module, args, kwargs in self.learn_chain:
             if module not in LearnModules:
                 raise KeyError(f"Learn module {module} is not registered")
 
-            oracle = LPbasedOracle(pool=subpool)
+            oracle = BudgetLPOracle(pool=subpool, deadline=deadline)
             self.module = LearnModules[module](*args, **kwargs)
             self.module.init(system=subpool.system, oracle=oracle)
             self.module.learn()
 
     @TimeStat.log
-    def extract_subpool_solutions(self, subpool):
+    def extract_solutions(self, learned, origin: tuple[int]):
+        """Maps constraints learned for a subproblem (learn_subproblem)
+        to the main pool from the given origin."""
+        direction = [-1 if v == 1 else 1 for v in origin]
         solutions = {}
         core = {}
-        for fset, cons_pool, cons_final in subpool.constraints:
-            qsi = [Bin(subpool.i2exc[i], self.pool.n).int for i in fset]
-
-            d = DenseSet(self.pool.n, qsi)
+        for qsi, cons_pool in learned:
+            d = denseset_from_codes(qsi, self.pool.n)
             assert d == d.LowerSet(), "temporary assert for no don't care case"
             dmax = d.MaxSet().to_Bins()
             dand = reduce(lambda a, b: a & b, dmax)
 
             # map points from subpool to the main pool
             # invert orientation (it's involution)
-            mainvec = SparseSet(
-                self.pool.exc2i[subpool.reorient_point(subpool.i2exc[i])]
-                for i in fset
-            )
+            qsi = self.pool.exclude.flip_codes(qsi, direction)
+            mainvec = SparseSet(self.pool.exclude.indices(qsi).tolist())
 
             core[mainvec] = dand
-            solutions[mainvec] = cons_final
+            solutions[mainvec] = cons_pool.reorient(direction)
         return core, solutions
+
+
+class ShiftBudgetExceeded(Exception):
+    pass
+
+
+class BudgetLPOracle(LPbasedOracle):
+    """LPbasedOracle raising ShiftBudgetExceeded after the deadline
+    (time.time()); the learn module saves the system and stops."""
+    def __init__(self, pool, deadline=None, **opts):
+        super().__init__(pool, **opts)
+        self.deadline = deadline
+
+    def _query(self, bads):
+        if self.deadline is not None and time.time() > self.deadline:
+            raise ShiftBudgetExceeded()
+        return super()._query(bads)
+
+
+class ShiftProgress:
+    """Progress over shifts weighted by their estimated costs, with ETA."""
+    log = logging.getLogger(f"{__name__}:ShiftProgress")
+
+    def __init__(self, total_cost, total):
+        self.total_cost = total_cost
+        self.total = total
+        self.cost = 0
+        self.num = 0
+        self.start = time.time()
+
+    def update(self, cost, num=1):
+        self.cost += cost
+        self.num += num
+        elapsed = time.time() - self.start
+        frac = self.cost / self.total_cost if self.total_cost else 1.0
+        eta = elapsed / frac - elapsed if frac else float("nan")
+        self.log.info(
+            f"progress: {self.num}/{self.total} shifts done,"
+            f" {frac * 100:5.1f}% of estimated cost,"
+            f" elapsed {elapsed:.1f}s, ETA {eta:.1f}s"
+        )
+
+
+def merge_time_stat(time_stat):
+    """Add TimeStat entries collected in a worker process."""
+    for name, stat in time_stat.items():
+        TimeStat.Stat.setdefault(name, TimeStat()).merge(stat)
+
+
+# ShiftLearn worker processes: include/exclude codes are shared read-only
+_worker_shift_learn = None
+
+
+def _shift_worker_init(n, include, exclude, path, learn_chain, time_budget):
+    global _worker_shift_learn
+    _worker_shift_learn = ShiftLearn.from_shared(
+        n, include, exclude, path, learn_chain, time_budget,
+    )
+
+
+def _shift_worker(task):
+    shift, subproblem = task
+    # only this shift's time (forked workers inherit the parent's stats)
+    TimeStat.reset_all()
+    learned = _worker_shift_learn.try_learn_subproblem(shift, subproblem)
+    time_stat = {name: stat for name, stat in TimeStat.Stat.items() if stat}
+    return shift, learned, time_stat
@@ -0,0 +1,151 @@
+"""
+Streaming merge of ShiftLearn results into the main system.
+
+A set of exclude points (vec) removable in a shift is removable by
+a single inequality of the main pool once it was found in all the
+2^|core| shifts it should appear in. Vectors are counted as the shifts
+complete and added to the system as soon as their count is reached.
+
+Pending vectors are kept in memory up to max_pending, then spilled
+as partial counts to FANOUT hash partitions in a directory private
+to the process (path/merge_*). In finish(), a partition with at most
+max_pending records is aggregated in memory; a larger one is first split
+again (with another hash) into FANOUT sub-partitions, recursively.
+Memory is thus bounded by about max_pending vectors (plus write buffers
+of WRITE_CHUNK records), whatever the number of shifts.
+A vector pending across several spills is written once per spill,
+so the disk use is proportional to the spilled records, not to the
+distinct vectors.
+"""
+
+import os
+import pickle
+import shutil
+import logging
+import tempfile
+
+from monolearn.utils import TimeStat
+
+
+class ShiftMerge:
+    log = logging.getLogger(f"{__name__}:ShiftMerge")
+
+    FANOUT = 16
+    MAX_LEVEL = 8  # e.g. one vector spilled very many times
+    WRITE_CHUNK = 2**14  # records buffered per partition write
+
+    def __init__(self, system, path, max_pending=10**6, clean=False):
+        """clean: remove the spill directories left in path
+        by interrupted runs (only if no other process may use path)."""
+        self.system = system
+        self.max_pending = max(1, int(max_pending))
+        self.pending = {}  # vec -> [core, ineq, count]
+        self.n_spilled = 0  # records
+        self.n_promoted = 0
+
+        os.makedirs(path, exist_ok=True)
+        if clean:
+            for name in os.listdir(path):
+                if name.startswith("merge_"):
+                    shutil.rmtree(os.path.join(path, name))
+        self.dir = tempfile.mkdtemp(prefix="merge_", dir=path)
+        self.sizes = [0] * self.FANOUT
+
+    def add(self, core, solutions):
+        """Add the solutions of one shift (as from extract_solutions)."""
+        for vec, ineq in solutions.items():
+            entry = self.pending.get(vec)
+            if entry is None:
+                entry = self.pending[vec] = [core[vec], ineq, 0]
+            assert entry[0] == core[vec]
+            entry[2] += 1
+            if entry[2] == 2**entry[0].weight:
+                self.promote(vec, entry[1])
+                del self.pending[vec]
+
+        if len(self.pending) > self.max_pending:
+            self.spill()
+
+    def promote(self, vec, ineq):
+        self.system.add_lower(vec, meta=ineq, is_prime=True)
+        self.n_promoted += 1
+
+    @TimeStat.log
+    def spill(self):
+        records = (
+            (vec, core, ineq, count)
+            for vec, (core, ineq, count) in self.pending.items()
+        )
+        sizes = self._write_parts(self.dir, 0, records)
+        self.sizes = [a + b for a, b in zip(self.sizes, sizes)]
+        self.log.info(f"spilled {len(self.pending)} pending vectors")
+        self.n_spilled += len(self.pending)
+        self.pending.clear()
+
+    @TimeStat.log
+    def finish(self):
+        """Promote the complete vectors among the spilled ones."""
+        if any(self.sizes):
+            self.spill()
+            self._aggregate(self.dir, 0, self.sizes)
+            self.sizes = [0] * self.FANOUT
+        # the rest of pending vectors are incomplete
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+    def _part(self, directory, i):
+        return os.path.join(directory, f"part_{i}")
+
+    def _write_parts(self, directory, level, records):
+        sizes = [0] * self.FANOUT
+        buffers = [[] for _ in range(self.FANOUT)]
+
+        def flush(i):
+            with open(self._part(directory, i), "ab") as f:
+                pickle.dump(buffers[i], f, protocol=pickle.HIGHEST_PROTOCOL)
+            buffers[i] = []
+
+        for record in records:
+            i = hash((level, record[0])) % self.FANOUT
+            buffers[i].append(record)
+            sizes[i] += 1
+            if len(buffers[i]) >= self.WRITE_CHUNK:
+                flush(i)
+        for i in range(self.FANOUT):
+            if buffers[i]:
+                flush(i)
+        return sizes
+
+    def _read(self, filename):
+        with open(filename, "rb") as f:
+            while True:
+                try:
+                    yield from pickle.load(f)
+                except EOFError:
+                    return
+
+    def _aggregate(self, directory, level, sizes):
+        for i, size in enumerate(sizes):
+            if not size:
+                continue
+            filename = self._part(directory, i)
+            if size > self.max_pending and level < self.MAX_LEVEL:
+                sub = os.path.join(directory, f"sub_{i}")
+                os.mkdir(sub)
+                sub_sizes = self._write_parts(
+                    sub, level + 1, self._read(filename),
+                )
+                os.unlink(filename)
+                self._aggregate(sub, level + 1, sub_sizes)
+                continue
+
+            counts = {}
+            for vec, core, ineq, count in self._read(filename):
+                entry = counts.get(vec)
+                if entry is None:
+                    entry = counts[vec] = [core, ineq, 0]
+                assert entry[0] == core
+                entry[2] += count
+            for vec, (core, ineq, count) in counts.items():
+                if count == 2**core.weight:
+                    self.promote(vec, ineq)
+            os.unlink(filename)
@@ -0,0 +1,231 @@
+"""
+Work queue of ShiftLearn subproblems in a shared directory,
+for several processes (possibly on different machines
+sharing the filesystem) learning the same set.
+
+Layout (keys are the representative shifts' hex codes):
+    <root>/<key>.lease       claimed by a process (owner info inside),
+                             mtime refreshed by a heartbeat thread
+    <root>/<key>.result      pickled [(origin, core, solutions), ...]
+    <root>/<key>.unfinished  given up after the time budget inside
+                             (partial system saved), claimable again
+                             by a process with no or a larger budget
+
+A lease is claimed by an exclusive create. A lease not refreshed
+for lease_time seconds (dead process) is taken over: it is first renamed
+to a unique name (only one process can succeed), then claimed as usual.
+If the renamed lease turns out to be fresh (another process took it over
+meanwhile), it is put back.
+A process only removes leases with its own owner line. A process whose
+lease was taken over (or lost in a race) notices it when refreshing
+the lease or completing the key, and drops its result.
+Results are written to a temporary file and renamed into place.
+"""
+
+import os
+import time
+import pickle
+import socket
+import logging
+import threading
+
+
+class ShiftQueue:
+    log = logging.getLogger(f"{__name__}:ShiftQueue")
+
+    def __init__(self, root, lease_time=600, time_budget=None):
+        self.root = root
+        self.lease_time = float(lease_time)
+        self.time_budget = time_budget
+        self.owner = f"{socket.gethostname()}:{os.getpid()}"
+        self.owned = set()
+        self.lost = set()  # claimed keys whose lease went to another owner
+        self._lock = threading.Lock()
+        self._stop = None
+        self._heartbeat = None
+        os.makedirs(self.root, exist_ok=True)
+
+    def _file(self, key, kind):
+        return os.path.join(self.root, f"{key}.{kind}")
+
+    def is_finished(self, key):
+        """Done, or given up with a budget not smaller than ours."""
+        if os.path.exists(self._file(key, "result")):
+            return True
+        try:
+            with open(self._file(key, "unfinished"), "rb") as f:
+                budget = pickle.load(f)
+        except FileNotFoundError:
+            return False
+        if not isinstance(budget, (int, float)):
+            budget = None
+        if self.time_budget is None:
+            return budget is None
+        return budget is not None and budget >= self.time_budget
+
+    def claim(self, key) -> bool:
+        """Try to claim the key (False if finished or leased by another)."""
+        if self.is_finished(key):
+            return False
+        lease = self._file(key, "lease")
+        if not self._create(lease):
+            if not self._take_over(lease):
+                return False
+            if not self._create(lease):
+                return False
+        if self.is_finished(key):
+            # finished (and released) meanwhile
+            self._unlink_own(lease)
+            return False
+        with self._lock:
+            self.owned.add(key)
+        return True
+
+    def _create(self, lease):
+        try:
+            fd = os.open(lease, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        with os.fdopen(fd, "w") as f:
+            print(self.owner, time.time(), file=f)
+        return True
+
+    def _owner(self, lease):
+        try:
+            with open(lease) as f:
+                words = f.read().split()
+        except FileNotFoundError:
+            return
+        return words[0] if words else None
+
+    def owns(self, key) -> bool:
+        return key not in self.lost \
+            and self._owner(self._file(key, "lease")) == self.owner
+
+    def _unlink_own(self, lease):
+        if self._owner(lease) == self.owner:
+            try:
+                os.unlink(lease)
+            except FileNotFoundError:
+                pass
+
+    def _age(self, filename):
+        return time.time() - os.stat(filename).st_mtime
+
+    def _take_over(self, lease):
+        try:
+            age = self._age(lease)
+        except FileNotFoundError:
+            return True
+        if age < self.lease_time:
+            return False
+        stale = f"{lease}.{self.owner}.stale"
+        try:
+            os.rename(lease, stale)
+        except FileNotFoundError:
+            # taken over by another process
+            return False
+        if self._age(stale) < self.lease_time:
+            # taken over and renewed by another process meanwhile
+            try:
+                os.link(stale, lease)
+            except FileExistsError:
+                # a third process claimed it meanwhile,
+                # the owner of the fresh lease will notice and drop it
+                self.log.warning(
+                    f"fresh lease {lease} of {self._owner(stale)}"
+                    " lost in a race"
+                )
+            os.unlink(stale)
+            return False
+        self.log.warning(
+            f"taking over lease {lease} expired {age:.0f}s ago"
+        )
+        os.unlink(stale)
+        return True
+
+    def release(self, key):
+        with self._lock:
+            self.owned.discard(key)
+            self.lost.discard(key)
+        self._unlink_own(self._file(key, "lease"))
+
+    def complete(self, key, records) -> bool:
+        """Store the results of a claimed key and release it
+        (False if the lease was lost, nothing is stored then)."""
+        if not self._check_owned(key):
+            return False
+        self._write(self._file(key, "result"), records)
+        try:
+            os.unlink(self._file(key, "unfinished"))
+        except FileNotFoundError:
+            pass
+        self.release(key)
+        return True
+
+    def give_up(self, key) -> bool:
+        """Mark a claimed key as over our time budget and release it
+        (False if the lease was lost)."""
+        if not self._check_owned(key):
+            return False
+        self._write(self._file(key, "unfinished"), self.time_budget)
+        self.release(key)
+        return True
+
+    def _check_owned(self, key):
+        if self.owns(key):
+            return True
+        self.log.warning(f"lost the lease of {key}, dropping its result")
+        self.release(key)
+        return False
+
+    def load(self, key):
+        """Records of a finished key (None if given up)."""
+        try:
+            with open(self._file(key, "result"), "rb") as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            if os.path.exists(self._file(key, "unfinished")):
+                return
+            raise
+
+    def _write(self, filename, data):
+        tmp = f"{filename}.{self.owner}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, filename)
+
+    def _beat(self):
+        while not self._stop.wait(self.lease_time / 4):
+            self.refresh()
+
+    def refresh(self):
+        """Refresh our leases, marking the ones owned by others as lost."""
+        with self._lock:
+            owned = list(self.owned - self.lost)
+        for key in owned:
+            lease = self._file(key, "lease")
+            if self._owner(lease) != self.owner:
+                self.log.warning(f"lost the lease of {key}")
+                with self._lock:
+                    self.lost.add(key)
+                continue
+            try:
+                os.utime(lease)
+            except FileNotFoundError:
+                pass
+
+    def __enter__(self):
+        """Start refreshing the leases of claimed keys."""
+        self._stop = threading.Event()
+        self._heartbeat = threading.Thread(target=self._beat, daemon=True)
+        self._heartbeat.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._heartbeat.join()
+        for key in list(self.owned):
+            self.release(key)
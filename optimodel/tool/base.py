@@ -2,7 +2,10 @@ import sys
 import logging
 
 from time import time
-from binteger import Bin
+
+from subsets import DenseSet
+
+from optimodel.packed_points import PackedPoints
 
 
 class BaseTool:
@@ -92,16 +95,18 @@ def parse_value(s: str):
     return s
 
 
-def complement_binary(s: set[tuple[int]]):
-    for v in s:
-        n = len(v)
-        break
-    else:
-        raise ValueError("unknown dimension (empty set)")
+def complement_binary(s) -> DenseSet:
+    """Complement of a binary point set in {0,1}^n, as a DenseSet.
 
-    s = {Bin(v, n).int for v in s}
-    s2 = set()
-    for x in range(2**n):
-        if x not in s:
-            s2.add(Bin(x, n).tuple)
-    return s2
+    The set can be given as a DenseSet, PackedPoints
+    or an iterable of tuples.
+    """
+    if isinstance(s, DenseSet):
+        d = s.copy()
+    else:
+        s = PackedPoints.coerce(s)
+        if not s.n:
+            raise ValueError("unknown dimension (empty set)")
+        d = s.to_DenseSet()
+    d.do_Complement()
+    return d
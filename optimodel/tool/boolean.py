@@ -1,20 +1,24 @@
 import os
 import argparse
+import multiprocessing
 
 from enum import Enum
 from time import time
 
-from binteger import Bin
+import numpy as np
+
 from subsets import DenseSet
 
 from subsets.max_cubes import MaxCubes_Dense2
 from subsets.max_cubes import MaxCubes_Dense3
 
 from monolearn.SparseSet import SparseSet
-from monolearn.utils import TimeStat
+from monolearn.utils import TimeStat, dictify_add_class
 
 from optimodel.constraint_pool import ConstraintPool
 from optimodel.clause import AndClause, OrClause
+from optimodel.packed_points import PackedPoints
+from optimodel.shared import SharedArray
 
 from optimodel.tool.constraint_base import ConstraintTool
 from optimodel.tool.set_files import read_set, SetType, TypeGood
@@ -54,6 +58,7 @@ class ToolBoolean(ConstraintTool):
         self.fileprefix = None
         self.output_prefix = None
         self.dontcare = None
+        self.cache_sets = None
         self.sysfile = None
         self.coverspace = None
         self.cubespace = None
@@ -82,6 +87,12 @@ class ToolBoolean(ConstraintTool):
                  " for generating maximal cubes"
                  " (`included` still used for coverage)."
         )
+        parser.add_argument(
+            "--cache-sets", action="store_true",
+            help="Save parsed include/exclude sets to binary .npy files"
+                 " next to them (memory-mapped by later runs)."
+        )
+        self.add_result_cache_arguments(parser)
         parser.add_argument("--cnf", action="store_true", help="Generate CNF")
         parser.add_argument("--dnf", action="store_true", help="Generate DNF")
         parser.add_argument(
@@ -110,6 +121,7 @@ class ToolBoolean(ConstraintTool):
         self.log.info(args)
 
         self.dontcare = args.dontcare
+        self.cache_sets = args.cache_sets
         self.sysfile = self.output_prefix + "system.bz2"
 
         try:
@@ -119,6 +131,8 @@ class ToolBoolean(ConstraintTool):
 
         self.read_sets(typ)
 
+        # DNF systems store AndClause's as meta, needed to load saved systems
+        dictify_add_class(AndClause)
         self.pool = ConstraintPool(
             include=None,
             exclude=self.coverspace,
@@ -126,9 +140,19 @@ class ToolBoolean(ConstraintTool):
             output_prefix=self.output_prefix,
             constraint_class=OrClause,  # even in CNF we first cover the complement with Or clauses, then flip
         )
+        self.pool.verify_include = self.otherspace
 
         self.force = args.force
 
+        tags = dict(format=self.format.value, dontcare=self.dontcare)
+        if self.dontcare:
+            tags["cubespace"] = PackedPoints.from_DenseSet(self.cubespace).digest()
+        # --force: recompute, but still store the result
+        if self.setup_result_cache(args, lookup=not self.force, **tags) \
+           and not args.commands:
+            self.log_time_stats(header="Finished (cached)")
+            return
+
         self.log.info(f"using output prefix {self.output_prefix}")
 
         commands = args.commands or AutoDefault
@@ -138,35 +162,37 @@ class ToolBoolean(ConstraintTool):
         for cmd in commands:
             self.run_command_string(cmd)
 
+        self.store_result_cache()
+
         self.log_time_stats(header="Finished")
 
     def read_sets(self, typ: TypeGood):
+        # coverspace: PackedPoints (to be covered by the system)
+        # cubespace: DenseSet (to generate maximal cubes from)
+        # otherspace: PackedPoints (must stay uncovered, for verification)
         if self.format == Format.CNF:
             self.log.info("CNF format: using excluded set")
-
-            self.coverspace = read_set(self.fileprefix + "exclude")
-            if self.dontcare:
-                self.cubespace = \
-                    complement_binary(read_set(self.fileprefix + "include"))
-            else:
-                self.cubespace = self.coverspace
-
+            cover, other = "exclude", "include"
         elif self.format == Format.DNF:
             self.log.info("DNF format: using included set")
-
-            self.coverspace = read_set(self.fileprefix + "include")
-            if self.dontcare:
-                self.cubespace = \
-                    complement_binary(read_set(self.fileprefix + "exclude"))
-            else:
-                self.cubespace = self.coverspace
-
+            cover, other = "include", "exclude"
         else:
             raise RuntimeError()
 
+        self.coverspace = self.read_set(cover)
+        self.otherspace = None
+        if self.dontcare or typ.type_good == TypeGood.EXPLICIT:
+            self.otherspace = self.read_set(other)
+        if self.dontcare:
+            self.cubespace = complement_binary(self.otherspace)
+        else:
+            self.cubespace = self.coverspace.to_DenseSet()
+
         if typ.type_good in (TypeGood.LOWER, TypeGood.UPPER):
             self.log.warning(f"expanding {typ.type_good.value} include set into EXPLICIT")
 
+            # the other set is not expanded, do not verify against it
+            self.otherspace = None
             if (self.format == Format.CNF) ^ (typ.type_good == TypeGood.UPPER):
                 self.coverspace = to_upper(self.coverspace)
                 self.cubespace = to_upper(self.cubespace)
@@ -176,8 +202,11 @@ class ToolBoolean(ConstraintTool):
             else:
                 raise RuntimeError()
 
+    def read_set(self, name):
+        return read_set(self.fileprefix + name, cache=self.cache_sets)
+
     @TimeStat.log
-    def MaxCubes(self, algorithm="Dense3", checks=0):
+    def MaxCubes(self, algorithm="Dense3", checks=0, workers=1):
         if algorithm == "Sparse":
             raise NotImplementedError(
                 "MaxCubes:Sparse not implemented, use MaxCubes:Dense2 or MaxCubes:Dense3"
@@ -205,44 +234,32 @@ class ToolBoolean(ConstraintTool):
 
         self.log.info("filling the system with cubes...")
         n = self.pool.n
-        for a, u in cubes:
-            a = Bin(a, n)
-            u = Bin(u, n)
-            assert a & u == 0
-            # a + lowerset(u) subseteq EXC
-            rem_clause = []
-            for i in range(n):
-                if u[i] == 0:  # non-wildcard
-                    if a[i] == 0:
-                        rem_clause.append(-(i+1))
-                    else:
-                        rem_clause.append((i+1))
+        if workers > 1:
+            results = self._cube_constraints_parallel(cubes, workers)
+        else:
+            results = (
+                cube_constraint(a, u, n, self.pool.exclude) for a, u in cubes
+            )
+
+        for (rem_clause, inds), (a, u) in zip(results, cubes):
             rem_clause = AndClause(rem_clause)  # subseteq EXC
             keep_clause = ~rem_clause  # superseteq INC
 
-            # option 1: expand cube and check each point
-            cube = rem_clause.solutions(n).to_Bins()
-
             if checks:
                 d = DenseSet(n)
-                d.set(u.int)
+                d.set(u)
                 d.do_LowerSet()
-                d.do_Not(a.int)
-                assert rem_clause.solutions(n).to_Bins() == d.to_Bins()
+                d.do_Not(a)
+                cube = rem_clause.solutions(n).to_Bins()
+                assert cube == d.to_Bins()
                 for v in cube:
                     assert rem_clause.satisfy(v)
+                assert inds.tolist() == sorted(
+                    ind for ind in (self.pool.exc2i.get(v.tuple) for v in cube)
+                    if ind is not None
+                )
 
-            inds = []
-            for pt in cube:
-                ind = self.pool.exc2i.get(Bin(pt, n).tuple)
-                # can be None if it's a `don't care` point
-                if ind is not None:
-                    inds.append(ind)
-
-            # option 2: iterate through exclude points and check cube
-            # todo
-
-            fset = SparseSet(inds)
+            fset = SparseSet(inds.tolist())
             if self.format == Format.CNF:
                 clause = keep_clause
             else:
@@ -253,30 +270,95 @@ class ToolBoolean(ConstraintTool):
         self.pool.system.set_complete_lower()
         self.pool.system.save()
 
+    def _cube_constraints_parallel(self, cubes, workers):
+        exclude = self.pool.exclude
+        if exclude.codes.dtype == object:
+            self.log.warning(
+                f"n={exclude.n} too large for shared codes, using 1 worker"
+            )
+            for a, u in cubes:
+                yield cube_constraint(a, u, exclude.n, exclude)
+            return
+
+        chunk = max(1, min(4096, len(cubes) // (workers * 16)))
+        chunks = [cubes[i:i+chunk] for i in range(0, len(cubes), chunk)]
+        self.log.info(
+            f"processing {len(cubes)} cubes"
+            f" in {len(chunks)} chunks with {workers} workers"
+        )
+        with SharedArray(exclude.codes) as codes, \
+             multiprocessing.Pool(
+                processes=workers,
+                initializer=_cube_worker_init,
+                initargs=(codes, exclude.n),
+             ) as pool:
+            for results in pool.imap(_cube_worker, chunks):
+                yield from results
+
+    def cached_constraint_class(self):
+        if self.format == Format.DNF:
+            return AndClause
+        return OrClause
+
     def _output_one(self, clause):
         if self.format == Format.DNF:
             clause = ~clause
         return super()._output_one(clause)
 
 
+def cube_constraint(a: int, u: int, n: int, exclude: PackedPoints):
+    """Literals of the cube a + LowerSet(u) (as AndClause)
+    and indices of the exclude points in it."""
+    assert a & u == 0
+    rem_clause = []
+    for i in range(n):
+        bit = 1 << (n - 1 - i)
+        if not u & bit:  # non-wildcard
+            if not a & bit:
+                rem_clause.append(-(i+1))
+            else:
+                rem_clause.append((i+1))
+
+    # cube points in exclude
+    # (cube can have `don't care` points which are not in exclude)
+    inds = exclude.cube_indices(a, u)
+    return tuple(rem_clause), inds
+
+
+# MaxCubes worker processes: exclude codes are shared read-only
+_worker_codes = None
+_worker_exclude = None
+
+
+def _cube_worker_init(codes: SharedArray, n: int):
+    global _worker_codes, _worker_exclude
+    _worker_codes = codes  # keep the shared memory attached
+    _worker_exclude = PackedPoints.from_codes(codes.array, n, is_sorted=True)
+
+
+def _cube_worker(cubes):
+    n = _worker_exclude.n
+    ret = []
+    for a, u in cubes:
+        rem_clause, inds = cube_constraint(a, u, n, _worker_exclude)
+        ret.append((rem_clause, inds.astype(np.uint32)))
+    return ret
+
+
 def to_lower(P):
-    for v in P:
-        n = len(v)
-        break
-    else:
-        return []
-    P = [Bin(v, n).int for v in P]
-    return [v.tuple for v in DenseSet(n, P).LowerSet().to_Bins()]
+    """Lower set closure of a DenseSet or of (binary) PackedPoints,
+    returned in the same representation."""
+    if isinstance(P, DenseSet):
+        return P.LowerSet()
+    return PackedPoints.from_DenseSet(P.to_DenseSet().LowerSet())
 
 
 def to_upper(P):
-    for v in P:
-        n = len(v)
-        break
-    else:
-        return []
-    P = [Bin(v, n).int for v in P]
-    return [v.tuple for v in DenseSet(n, P).UpperSet().to_Bins()]
+    """Upper set closure of a DenseSet or of (binary) PackedPoints,
+    returned in the same representation."""
+    if isinstance(P, DenseSet):
+        return P.UpperSet()
+    return PackedPoints.from_DenseSet(P.to_DenseSet().UpperSet())
 
 
 def main():
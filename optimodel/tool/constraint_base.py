@@ -1,5 +1,9 @@
+import os
+import shutil
+
 from monolearn.utils import TimeStat
 
+from optimodel.result_cache import ResultCache
 from optimodel.tool.base import BaseTool
 
 
@@ -79,6 +83,74 @@ class ConstraintTool(BaseTool):
 
     pool = NotImplemented  # instance attribute
 
+    result_cache = None
+    fingerprint = None
+
+    @staticmethod
+    def add_result_cache_arguments(parser):
+        parser.add_argument(
+            "--result-cache", type=str, metavar="DIR",
+            default=os.environ.get(ResultCache.ENV) or None,
+            help="Use a cache of solved instances in DIR"
+                 f" (default: ${ResultCache.ENV} if set, else no cache)."
+                 " On a hit, the stored system and best subset are restored"
+                 " and, unless commands are given explicitly,"
+                 " the tool exits without learning.",
+        )
+
+    def setup_result_cache(self, args, lookup=True, **tags):
+        """Fingerprint the pool and restore the cached result, if any
+        (only with --result-cache).
+
+        Returns True if the cached result was restored.
+        """
+        self.fingerprint = self.pool.fingerprint(kind=self.KIND, **tags)
+        self.log.info(f"instance fingerprint {self.fingerprint}")
+
+        if args.result_cache is None:
+            return False
+        self.result_cache = ResultCache(args.result_cache)
+        if not lookup:
+            return False
+
+        cached = self.result_cache.lookup(self.fingerprint)
+        if cached is None:
+            self.log.info(f"result cache {self.result_cache.root}: miss")
+            return False
+
+        self.log.info(
+            f"result cache {self.result_cache.root}: hit"
+            f" {len(cached.constraints)} constraints (optimal? {cached.optimal})"
+            f" from {cached.source}"
+        )
+        sysfile = self.pool.system.file
+        if cached.sysfile and sysfile and not os.path.exists(sysfile):
+            shutil.copyfile(cached.sysfile, sysfile)
+            self.pool.system.load()
+
+        cls = self.cached_constraint_class()
+        self.pool.report(
+            [cls(cons) for cons in cached.constraints],
+            source=f"cache:{self.fingerprint}:{cached.source}",
+            optimal=cached.optimal,
+        )
+        return True
+
+    def cached_constraint_class(self):
+        """Class of the reported constraints (cached as plain tuples)."""
+        return self.pool.constraint_class
+
+    def store_result_cache(self):
+        if self.result_cache is None or self.pool.best_subset is None:
+            return
+        self.result_cache.store(
+            self.fingerprint,
+            constraints=self.pool.best_subset,
+            optimal=self.pool.best_subset_optimal,
+            source=self.pool.best_subset_source,
+            sysfile=self.sysfile,
+        )
+
     @TimeStat.log
     def AutoSelect(self):
         n_sets = len(self.pool.constraints)
@@ -1,4 +1,5 @@
 import os
+import json
 
 import argparse
 from argparse import RawTextHelpFormatter
@@ -8,7 +9,8 @@ from monolearn.utils import TimeStat
 
 from optimodel.constraint_pool import ConstraintPool
 from optimodel.shift_learn import ShiftLearn
-from optimodel.lp_oracle import LPbasedOracle
+from optimodel.lp_oracle import LPbasedOracle, ParallelLPOracle
+from optimodel.batch_learn import BatchLevelLearn  # registers the module
 from optimodel.inequality import Inequality
 
 from optimodel.tool.constraint_base import ConstraintTool
@@ -58,6 +60,7 @@ class ToolMILP(ConstraintTool):
     Generate inequalities to model a set.
     AutoSimple: alias for
         {" ".join(AutoSimple)}
+        (with BatchLevelLearn instead of LevelLearn if --lp-workers > 1)
     AutoSelect: alias for automatic subset selection (depends on system's size)
     AutoShifts: alias for
         {" ".join(AutoShifts)}
@@ -67,9 +70,72 @@ class ToolMILP(ConstraintTool):
 
         parser.add_argument(
             "--lp-solver", type=str,
-            help="LP Oracle Solver. Best are swiglpk or gurobi.",
+            help="LP Oracle Solver. Best are swiglpk or gurobi;"
+            " native is a small dense NumPy simplex (feasibility only).",
             default="swiglpk",
         )
+        parser.add_argument(
+            "--lp-incremental", action="store_true",
+            help="LP Oracle: keep exclude points' rows in the model"
+            " and toggle them by bounds, warm-starting from the previous"
+            " basis (swiglpk or gurobi).",
+        )
+        parser.add_argument(
+            "--lp-workers", type=int, default=1,
+            help="LP Oracle: number of worker processes solving batches"
+            " of queries (used by batching modules, e.g. BatchLevelLearn).",
+        )
+        parser.add_argument(
+            "--lp-cache-size", type=int, default=2**12,
+            help="LP Oracle: max. number of known feasible (and, separately,"
+            " infeasible) queries to answer sub/super-set queries from"
+            " without LP (0 to disable); a lookup costs up to O(size)."
+            " Exact answers are kept for the last"
+            f" max(size, {LPbasedOracle.EXACT_CACHE_SIZE}) queries.",
+        )
+        parser.add_argument(
+            "--lp-cut-pool", type=int, default=2**12,
+            help="LP Oracle: max. number of found inequalities kept with"
+            " the sets of exclude points they cut, to answer queries"
+            " covered by one of them without LP (0 to disable).",
+        )
+        parser.add_argument(
+            "--lp-report-cuts", action="store_true",
+            help="LP Oracle: add the full set of exclude points removed by"
+            " each found inequality to the system (as a feasible set).",
+        )
+        parser.add_argument(
+            "--lp-cores", action="store_true",
+            help="LP Oracle: reduce each infeasible query to a minimal"
+            " infeasible subset (deletion filter), which rules out all"
+            " queries containing it and is added to the system.",
+        )
+        parser.add_argument(
+            "--lp-lazy-include", action="store_true",
+            help="LP Oracle: start with a few include points' rows and add"
+            " the rows of include points violated by found inequalities"
+            " (kept for later queries).",
+        )
+        parser.add_argument(
+            "--lp-dominance", action="store_true",
+            help="LP Oracle (upper sets): settle queries by dominance"
+            " (bad point above an include point, or the join of bad points"
+            " above no include point) without LP.",
+        )
+        parser.add_argument(
+            "--lp-verify", type=str, default="full",
+            choices=LPbasedOracle.VERIFY_LEVELS,
+            help="LP Oracle: check found inequalities against all include"
+            " points (full, default), a random sample of them (sampled)"
+            " or not at all (off). Chosen subsets are always fully verified.",
+        )
+        parser.add_argument(
+            "--cache-sets", action="store_true",
+            help="Save parsed include/exclude sets to binary .npy files"
+            " next to them (memory-mapped by later runs).",
+        )
+
+        self.add_result_cache_arguments(parser)
 
         parser.add_argument(
             "fileprefix", type=str,
@@ -97,15 +163,13 @@ class ToolMILP(ConstraintTool):
 
         self.sysfile = self.output_prefix + "system.bz2"
 
-        include = read_set(self.fileprefix + "include")
-        exclude = read_set(self.fileprefix + "exclude")
+        include = read_set(self.fileprefix + "include", cache=args.cache_sets)
+        exclude = read_set(self.fileprefix + "exclude", cache=args.cache_sets)
         typ = SetType.read_from_file(self.fileprefix + "type")
 
-        for v in exclude:
-            n = len(v)
-            break
-        else:
+        if not len(exclude):
             raise ValueError("exclude should be nonempty")
+        n = exclude.n
 
         self.log.info(f"set type: {typ}, n {n}")
 
@@ -134,14 +198,36 @@ class ToolMILP(ConstraintTool):
             output_prefix=self.output_prefix,
             constraint_class=Inequality,
         )
+        if self.setup_result_cache(args, type_good=typ.type_good.value) \
+           and not args.commands:
+            self.log_time_stats(header="Finished (cached)")
+            return
+
         args.lp_solver = args.lp_solver.lower()
         if args.lp_solver == "none":
             args.lp_solver = None
-        self.oracle = LPbasedOracle(pool=self.pool, solver=args.lp_solver)
+        oracle_opts = dict(
+            pool=self.pool,
+            solver=args.lp_solver,
+            incremental=args.lp_incremental,
+            cache_size=args.lp_cache_size,
+            cut_pool_size=args.lp_cut_pool,
+            report_cuts=args.lp_report_cuts,
+            cores=args.lp_cores,
+            lazy_include=args.lp_lazy_include,
+            dominance=args.lp_dominance,
+            verify=args.lp_verify,
+        )
+        if args.lp_workers > 1:
+            self.oracle = ParallelLPOracle(
+                workers=args.lp_workers, **oracle_opts,
+            )
+        else:
+            self.oracle = LPbasedOracle(**oracle_opts)
 
         commands = args.commands
         if self.pool.is_upper:
-            commands = commands or AutoSimple
+            commands = commands or self.auto_simple()
         else:
             commands = commands or AutoShifts
 
@@ -149,8 +235,13 @@ class ToolMILP(ConstraintTool):
 
         self.chain = []
 
-        for cmd in commands:
-            self.run_command_string(cmd)
+        try:
+            for cmd in commands:
+                self.run_command_string(cmd)
+        finally:
+            self.oracle.close()
+
+        self.store_result_cache()
 
         self.log_time_stats(header="Finished")
 
@@ -158,8 +249,17 @@ class ToolMILP(ConstraintTool):
     def Chain(self, module, *args, **kwargs):
         self.chain.append((module, args, kwargs))
 
+    def auto_simple(self):
+        if isinstance(self.oracle, ParallelLPOracle):
+            # batches of level queries keep the workers busy
+            return tuple(
+                cmd.replace("Learn:LevelLearn,", "Learn:BatchLevelLearn,")
+                for cmd in AutoSimple
+            )
+        return AutoSimple
+
     def AutoSimple(self):
-        for cmd in AutoSimple:
+        for cmd in self.auto_simple():
             self.run_command_string(cmd)
 
     def AutoShifts(self):
@@ -177,18 +277,49 @@ class ToolMILP(ConstraintTool):
         self.module.init(system=self.pool.system, oracle=self.oracle)
         self.module.learn()
 
+        self.oracle.flush_system()
+        self.oracle.log_stat()
         self.log_time_stats(header=f"Learn:{module}")
+        self.write_oracle_summary(module)
+
+    def write_oracle_summary(self, module):
+        """Oracle statistics (cumulative over the run) as JSON."""
+        summary = dict(
+            module=module,
+            n_calls=self.oracle.n_calls,
+            **self.oracle.stats.summary(),
+        )
+        filename = self.output_prefix + "oracle_stats.json"
+        with open(filename, "w") as f:
+            json.dump(summary, f, indent=1)
+        self.log.info(f"oracle summary (saved to {filename}):")
+        self.log.info(json.dumps(summary))
 
     @TimeStat.log
-    def ShiftLearn(self, threads):
+    def ShiftLearn(
+        self, threads=1, chunk_size=1, start_method=None, resume=True,
+        time_budget=None, distributed=False, wait=True, lease_time=600,
+        max_pending=10**6,
+    ):
         path = self.fileprefix + "shifts"
         os.makedirs(path, exist_ok=True)
         sl = ShiftLearn(
             pool=self.pool,
             path=path,
             learn_chain=self.chain,
+            chunk_size=chunk_size,
+            start_method=start_method,
+            resume=bool(resume),
+            time_budget=time_budget,
+            distributed=bool(distributed),
+            wait=bool(wait),
+            lease_time=lease_time,
+            max_pending=max_pending,
         )
         sl.process_all_shifts(threads=threads)
+        if sl.distributed and not sl.wait:
+            # the waiting process composes the system
+            return
         sl.compose()
 
 
@@ -5,6 +5,12 @@ import logging
 from enum import Enum
 from collections import namedtuple
 
+import numpy as np
+
+from subsets import DenseSet
+
+from optimodel.packed_points import PackedPoints
+
 
 log = logging.getLogger(f"{__name__}")
 
@@ -32,30 +38,150 @@ SetType.read_from_file = classmethod(read_from_file)
 del read_from_file
 
 
-def read_set(filename):
+CHUNK_SIZE = 2**24  # bytes of text parsed at once
+
+
+def read_set(filename, cache=False) -> PackedPoints:
+    """Read a set of points from a .bz2, .txt or .set (DenseSet) file.
+
+    Text files start with the line "<number of points> <dimension>",
+    followed by one point per line (space-separated integers).
+
+    With cache=True, parsed text sets are saved as sorted points
+    into a binary file next to the source (<filename>.npy),
+    which later runs memory-map instead of parsing
+    (as long as the source's size and mtime are the ones recorded
+    in <filename>.npy.src).
+    """
     if filename.endswith(".bz2"):
-        log.info(f"reading bzip2 file {filename}")
-        f = bz2.open(filename, "rt")
+        opener = bz2.open
+        kind = "bzip2"
 
     elif filename.endswith(".txt"):
-        log.info(f"reading text file {filename}")
-        f = open(filename, "rt")
+        opener = open
+        kind = "text"
 
     elif filename.endswith(".set"):
-        from subsets import DenseSet
         log.info(f"reading DenseSet file {filename}")
         s = DenseSet.load_from_file(filename)
-        return set(s.to_Bins())
+        return PackedPoints.from_DenseSet(s)
 
     else:
         for ext in (".bz2", ".txt", ".set"):
             if os.path.isfile(filename + ext):
-                return read_set(filename + ext)
+                return read_set(filename + ext, cache=cache)
         raise NotImplementedError(f"{filename} should end with one of .bz, .txt, .set")
 
+    if cache:
+        pts = load_set_cache(filename)
+        if pts is not None:
+            return pts
+
+    log.info(f"reading {kind} file {filename}")
+    with opener(filename, "rb") as f:
+        matrix = parse_points(f)
+    pts = PackedPoints(matrix)
+    log.info(f"read {len(pts)} points, n {pts.n}")
+
+    if cache:
+        save_set_cache(filename, pts)
+    return pts
+
+
+def parse_points(f) -> np.ndarray:
+    """Parse the text set format from a binary file object
+    into an (N, n) matrix, a chunk of lines at a time."""
     num, n = map(int, f.readline().split())
-    s = set()
-    for i in range(num):
-        pt = tuple(map(int, f.readline().split()))
-        s.add(pt)
-    return s
+
+    rows = []
+    count = 0
+    tail = b""
+    while count < num:
+        data = f.read(CHUNK_SIZE)
+        if data:
+            data = tail + data
+            cut = data.rfind(b"\n") + 1
+            block, tail = data[:cut], data[cut:]
+        else:
+            block, tail = tail, b""
+            if not block:
+                break
+
+        values = parse_integers(block)
+        if values.size % n:
+            raise ValueError(f"malformed set file: rows of length {n} expected")
+        values = values.reshape(-1, n)
+        if values.size and values.min() >= 0 and values.max() < 256:
+            values = values.astype(np.uint8)
+        rows.append(values)
+        count += len(values)
+
+    if count < num:
+        raise ValueError(f"malformed set file: {num} points expected, got {count}")
+
+    if not rows:
+        return np.zeros((0, n), dtype=np.uint8)
+    return np.concatenate(rows)[:num]
+
+
+def parse_integers(block: bytes) -> np.ndarray:
+    """Whitespace-separated integers of a text block.
+
+    Blocks of single digits separated by single spaces/newlines
+    (the common binary case) are decoded directly from the bytes.
+    """
+    raw = np.frombuffer(block, dtype=np.uint8)
+    if len(raw) % 2 == 0:
+        digits = raw[0::2] - np.uint8(ord("0"))
+        seps = raw[1::2]
+        if (digits < 10).all() and ((seps == ord(" ")) | (seps == ord("\n"))).all():
+            return digits
+    try:
+        return np.array(block.split(), dtype=np.int64)
+    except ValueError as err:
+        raise ValueError(f"malformed set file: {err}") from None
+
+
+def set_cache_filename(filename):
+    return filename + ".npy"
+
+
+def set_cache_source(filename):
+    """Stamp of the source file recorded with its cache."""
+    stat = os.stat(filename)
+    return f"{stat.st_size} {stat.st_mtime_ns}"
+
+
+def load_set_cache(filename):
+    """Memory-map the cached set if it exists and is up to date."""
+    cache_filename = set_cache_filename(filename)
+    try:
+        with open(cache_filename + ".src") as f:
+            source = f.read().strip()
+        if source != set_cache_source(filename):
+            log.info(f"set cache {cache_filename} is outdated")
+            return
+        matrix = np.load(cache_filename, mmap_mode="r")
+    except FileNotFoundError:
+        return
+
+    log.info(f"reading set cache {cache_filename}")
+    return PackedPoints.from_sorted_matrix(matrix)
+
+
+def save_set_cache(filename, pts: PackedPoints):
+    cache_filename = set_cache_filename(filename)
+    tmp_filename = cache_filename + f".{os.getpid()}.tmp"
+    try:
+        source = set_cache_source(filename)
+        with open(tmp_filename, "wb") as f:
+            np.save(f, pts.matrix)
+        os.replace(tmp_filename, cache_filename)
+        # written last: a stamp never describes an older cache
+        with open(tmp_filename, "w") as f:
+            print(source, file=f)
+        os.replace(tmp_filename, cache_filename + ".src")
+    except OSError as err:
+        log.warning(f"could not save set cache {cache_filename}: {err}")
+        return
+    log.info(f"saved set cache {cache_filename}")
@@ -0,0 +1,56 @@
+import random
+from itertools import product
+
+import pytest
+
+from monolearn import Modules as LearnModules
+
+from optimodel.constraint_pool import ConstraintPool
+from optimodel.inequality import Inequality
+from optimodel.lp_oracle import LPbasedOracle, ParallelLPOracle
+from optimodel.batch_learn import BatchLevelLearn
+
+pytest.importorskip("swiglpk")
+
+
+def upper_pool(n=6, seed=4):
+    rnd = random.Random(seed)
+    pts = list(product(range(2), repeat=n))
+    mins = rnd.sample(pts, 5)
+    upper = [p for p in pts if any(min(p[i] - m[i] for i in range(n)) >= 0
+                                   for m in mins)]
+    return ConstraintPool(
+        include=upper,
+        exclude=[p for p in pts if p not in upper],
+        constraint_class=Inequality,
+        is_upper=True,
+    )
+
+
+def learned(module, oracle_class, **oracle_opts):
+    pool = upper_pool()
+    oracle = oracle_class(pool, solver="swiglpk", **oracle_opts)
+    try:
+        learn = LearnModules[module](levels_lower=3)
+        learn.init(system=pool.system, oracle=oracle)
+        learn.learn()
+    finally:
+        oracle.close()
+    # feasible levels stay in the oracle, minimal infeasible go to the system
+    cache = oracle._lower_cache
+    lower = {
+        vec for l in range(cache.range[1] + 1) for vec in cache.iter_weight(l)
+    }
+    return lower, set(pool.system.iter_upper()), oracle
+
+
+def test_batch_level_learn():
+    lower, upper, plain = learned("LevelLearn", LPbasedOracle)
+    assert lower and upper
+
+    blower, bupper, parallel = learned(
+        BatchLevelLearn.__name__, ParallelLPOracle, workers=2,
+    )
+    assert (blower, bupper) == (lower, upper)
+    # same queries reach the LP (nothing known is sent to the workers)
+    assert parallel.n_queries == plain.n_queries
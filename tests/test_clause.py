@@ -1,8 +1,11 @@
+from itertools import product
+
 import pytest
 
 from binteger import Bin
 
-from optimodel.clause import OrClause, AndClause
+from optimodel.clause import OrClause, AndClause, ClauseSystem
+from optimodel.packed_points import PackedPoints
 
 
 def test_OrClause():
@@ -157,6 +160,57 @@ def test_AndClause():
     ]
 
 
+def test_compile():
+    assert AndClause((1, -3)).compile(4) == (0b1010, 0b1000)
+    assert OrClause((1, -3)).compile(4) == (0b1010, 0b0010)
+    assert AndClause(()).compile(3) == (0, 0)
+
+    with pytest.raises(ValueError):
+        AndClause((1, -3)).compile(2)
+
+    # contradicting literals
+    assert not any(AndClause((2, -2)).satisfy(v) for v in product((0, 1), repeat=2))
+    assert all(OrClause((2, -2)).satisfy(v) for v in product((0, 1), repeat=2))
+
+    assert OrClause((1, -3)).satisfy(Bin(0b100, 3))
+    assert not OrClause((1, -3)).satisfy(Bin(0b001, 3))
+
+
+def test_satisfy_many():
+    n = 4
+    pts = PackedPoints(product((0, 1), repeat=n))
+    clauses = [
+        OrClause((1, -3)),
+        OrClause((-2, 4, 3)),
+        AndClause((-4,)),
+        AndClause((2, 1, -3)),
+    ]
+
+    for c in clauses:
+        assert c.satisfy_many(pts).tolist() == [c.satisfy(p) for p in pts]
+        assert c.satisfy_many(pts.matrix).tolist() \
+            == [c.satisfy(p) for p in pts]
+        assert c.satisfy_many(pts.codes, n=n).tolist() \
+            == [c.satisfy(p) for p in pts]
+        assert c.violated_mask(pts).tolist() \
+            == [not c.satisfy(p) for p in pts]
+
+    system = ClauseSystem(clauses, n=n)
+    mat = system.satisfy_matrix(pts)
+    for i, c in enumerate(clauses):
+        assert mat[i].tolist() == [c.satisfy(p) for p in pts]
+
+    cnf = OrClause.stack(clauses[:2], n=n)
+    assert cnf.satisfy_all(pts).tolist() \
+        == [all(c.satisfy(p) for c in clauses[:2]) for p in pts]
+    dnf = AndClause.stack(clauses[2:], n=n)
+    dnf.CHUNK = 3
+    assert dnf.satisfy_any(pts).tolist() \
+        == [any(c.satisfy(p) for c in clauses[2:]) for p in pts]
+
+
 if __name__ == '__main__':
     test_OrClause()
     test_AndClause()
+    test_compile()
+    test_satisfy_many()
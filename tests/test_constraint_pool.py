@@ -0,0 +1,54 @@
+import pytest
+
+from optimodel.constraint_pool import ConstraintPool
+from optimodel.inequality import Inequality
+from optimodel.clause import AndClause, OrClause
+
+
+def test_verify_subset():
+    exc = [(0, 0, 1), (1, 0, 0), (0, 0, 0)]
+    inc = [(1, 1, 1), (0, 1, 1), (1, 1, 0)]
+    for direction in (None, (-1, -1, -1)):
+        if direction:
+            exc, inc = [tuple(1 - v for v in p) for p in exc], \
+                [tuple(1 - v for v in p) for p in inc]
+        pool = ConstraintPool(
+            exclude=exc, include=inc, constraint_class=Inequality,
+            direction=direction, is_upper=True,
+        )
+        # x1 >= 1 in the original orientation
+        x1 = Inequality((0, 1, 0, -1))
+        if direction:
+            x1 = Inequality((0, -1, 0, 0))
+        pool.verify_subset([x1])
+        with pytest.raises(RuntimeError):
+            pool.verify_subset([Inequality((1, 0, 0, -1))])
+        with pytest.raises(RuntimeError):
+            pool.verify_subset([])
+
+
+def test_negative_coordinates():
+    pool = ConstraintPool(
+        include=[(0, -1), (1, 1)], exclude=[(-1, 0)],
+        constraint_class=Inequality,
+    )
+    assert list(pool.exclude) == [(-1, 0)]
+    # x0 >= 0
+    pool.verify_subset([Inequality((1, 0, 0))])
+    with pytest.raises(RuntimeError):
+        pool.verify_subset([Inequality((0, 1, 1))])
+
+
+def test_verify_subset_dnf():
+    # optimodel.boolean --dnf: the pool covers the selected points by cubes
+    sel = [(1, 0, 0), (1, 0, 1), (1, 1, 0), (1, 1, 1)]
+    other = [(0, 0, 0), (0, 0, 1), (0, 1, 0), (0, 1, 1)]
+    pool = ConstraintPool(exclude=sel, constraint_class=OrClause)
+    pool.verify_include = pool.exclude.coerce(other)
+
+    pool.verify_subset([AndClause((1,))])
+    pool.verify_subset([AndClause((1, 2)), AndClause((1, -2))])
+    with pytest.raises(RuntimeError):
+        pool.verify_subset([AndClause((1, 2))])  # (1, 0, *) not covered
+    with pytest.raises(RuntimeError):
+        pool.verify_subset([AndClause((1,)), AndClause((-2,))])
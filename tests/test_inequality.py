@@ -0,0 +1,47 @@
+from itertools import product
+
+import numpy as np
+
+from optimodel.inequality import Inequality, InequalitySystem
+from optimodel.packed_points import PackedPoints
+
+
+def test_Inequality_satisfy_many():
+    pts = PackedPoints(product(range(2), repeat=4))
+    ineq = Inequality((1, -2, 3, 0, -1))
+    assert ineq.satisfy_many(pts).tolist() == [ineq.satisfy(p) for p in pts]
+    assert ineq.violated_mask(pts).tolist() \
+        == [not ineq.satisfy(p) for p in pts]
+    assert ineq.satisfy_many((0, 0, 1, 1)).tolist() == [True]
+
+    ineq = Inequality((0.5, 0.5, 0, 0, -0.75))
+    assert ineq.satisfy_many(pts).tolist() == [ineq.satisfy(p) for p in pts]
+
+
+def test_InequalitySystem():
+    pts = PackedPoints(product(range(3), repeat=3))
+    ineqs = [
+        Inequality((1, 1, 1, -2)),
+        Inequality((-1, 0, 1, 1)),
+        Inequality((0, -2, 1, 3)),
+    ]
+    system = Inequality.stack(ineqs)
+    assert len(system) == 3
+
+    mat = system.satisfy_matrix(pts)
+    assert mat.shape == (3, len(pts))
+    for i, ineq in enumerate(ineqs):
+        assert mat[i].tolist() == [ineq.satisfy(p) for p in pts]
+
+    assert system.satisfy_all(pts).tolist() \
+        == [all(ineq.satisfy(p) for ineq in ineqs) for p in pts]
+    assert system.violated_any(pts).tolist() \
+        == [any(not ineq.satisfy(p) for ineq in ineqs) for p in pts]
+
+    system.CHUNK = 5
+    assert system.satisfy_all(pts).tolist() \
+        == [all(ineq.satisfy(p) for ineq in ineqs) for p in pts]
+
+    empty = InequalitySystem([], n=3)
+    assert empty.satisfy_all(pts).all()
+    assert empty.satisfy_all(np.zeros((0, 3), dtype=np.uint8)).shape == (0,)
@@ -0,0 +1,275 @@
+import random
+from itertools import product
+
+import pytest
+import numpy as np
+
+from monolearn.SparseSet import SparseSet
+
+from optimodel.constraint_pool import ConstraintPool
+from optimodel.inequality import Inequality
+from optimodel.lp_oracle import LPbasedOracle, ParallelLPOracle
+
+pytest.importorskip("swiglpk")
+
+
+def random_pool(n=6, n_include=30, seed=1, **kwargs):
+    rnd = random.Random(seed)
+    pts = list(product(range(2), repeat=n))
+    rnd.shuffle(pts)
+    return ConstraintPool(
+        include=pts[:n_include],
+        exclude=pts[n_include:],
+        constraint_class=Inequality,
+        **kwargs,
+    )
+
+
+def random_queries(pool, num=300, seed=2, max_size=4):
+    rnd = random.Random(seed)
+    return [
+        SparseSet(rnd.sample(range(len(pool.exclude)), rnd.randint(1, max_size)))
+        for _ in range(num)
+    ]
+
+
+def check_answers(pool, queries, answers):
+    n_feasible = 0
+    for bads, (ok, ineq) in zip(queries, answers):
+        if ok:
+            n_feasible += 1
+            assert ineq.satisfy_many(pool.include).all()
+            assert ineq.violated_mask(pool.exclude.matrix[list(bads)]).all()
+        else:
+            assert ineq is None
+    return n_feasible
+
+
+def test_incremental():
+    pool = random_pool()
+    queries = random_queries(pool)
+
+    plain = LPbasedOracle(pool, solver="swiglpk")
+    incremental = LPbasedOracle(pool, solver="swiglpk", incremental=True)
+
+    res1 = [plain._query(q) for q in queries]
+    res2 = [incremental._query(q) for q in queries]
+    assert [ok for ok, _ in res1] == [ok for ok, _ in res2]
+    assert 0 < check_answers(pool, queries, res2) < len(queries)
+    assert incremental.n_calls == len(queries)
+
+    assert incremental._query(SparseSet(())) == (True, (0,) * pool.n + (0,))
+
+
+
+def test_cache():
+    pool = random_pool()
+    queries = random_queries(pool)
+    queries += [SparseSet(q[:1]) for q in queries]
+
+    plain = LPbasedOracle(pool, solver="swiglpk")
+    cached = LPbasedOracle(pool, solver="swiglpk", cache_size=100)
+
+    res1 = [plain._query(q) for q in queries]
+    res2 = [cached._query(q) for q in queries]
+    assert [ok for ok, _ in res1] == [ok for ok, _ in res2]
+    check_answers(pool, queries, res2)
+    assert cached.n_calls == cached.cache.n_misses < plain.n_calls
+
+
+def test_exact_cache_bounded(monkeypatch):
+    monkeypatch.setattr(LPbasedOracle, "EXACT_CACHE_SIZE", 10)
+    pool = random_pool()
+    queries = list(dict.fromkeys(random_queries(pool)))
+    oracle = LPbasedOracle(pool, solver="swiglpk")
+    res = [oracle(q) for q in queries]
+    assert len(oracle._cache) == 10
+    assert oracle(queries[-1]) == res[-1]
+    oracle.clean()
+    assert oracle._cache.max_size == 10
+
+
+def test_parallel():
+    pool = random_pool()
+    queries = random_queries(pool)
+
+    plain = LPbasedOracle(pool, solver="swiglpk")
+    parallel = ParallelLPOracle(
+        pool, workers=2, solver="swiglpk", incremental=True, cache_size=100,
+    )
+    try:
+        res1 = [plain._query(q) for q in queries]
+        res2 = parallel.query_many(queries[:200] + [SparseSet(())])
+        res2 = res2[:200] + [parallel(q) for q in queries[200:]]
+    finally:
+        parallel.close()
+    assert [ok for ok, _ in res1] == [ok for ok, _ in res2]
+    check_answers(pool, queries, res2)
+
+
+def test_cut_pool():
+    pool = random_pool()
+    queries = random_queries(pool, max_size=2)
+
+    plain = LPbasedOracle(pool, solver="swiglpk")
+    cuts = LPbasedOracle(pool, solver="swiglpk", cut_pool_size=100)
+
+    res1 = [plain._query(q) for q in queries]
+    res2 = [cuts._query(q) for q in queries]
+    assert [ok for ok, _ in res1] == [ok for ok, _ in res2]
+    check_answers(pool, queries, res2)
+    assert cuts.cuts.n_hits > 0
+    assert cuts.n_calls == cuts.cuts.n_misses < plain.n_calls
+    assert cuts.stats.by_source["cut_pool"] == cuts.cuts.n_hits
+    assert cuts.stats.by_source["lp"] == cuts.n_calls
+    assert plain.stats.summary()["lp"]["calls"] == len(queries)
+
+
+def test_report_cuts():
+    for cut_pool_size in (0, 100):
+        pool = random_pool()
+        queries = [SparseSet((i,)) for i in range(len(pool.exclude))]
+        oracle = LPbasedOracle(
+            pool, solver="swiglpk",
+            cut_pool_size=cut_pool_size, report_cuts=True,
+        )
+        for q in queries:
+            oracle._query(q)
+        assert pool.system.n_lower() == 0
+        assert oracle.found_cuts
+
+        oracle.flush_system()
+        assert not oracle.found_cuts
+        assert pool.system.n_lower() == oracle.n_reported > 0
+        for cut in pool.system.iter_lower():
+            ineq = pool.system.meta[cut]
+            assert ineq.satisfy_many(pool.include).all()
+            assert SparseSet(ineq.violated_mask(pool.exclude).nonzero()[0]) \
+                == cut
+            assert len(cut) > 1
+
+
+def test_cores():
+    pool = random_pool()
+    oracle = LPbasedOracle(pool, solver="swiglpk", cache_size=100, cores=True)
+    plain = LPbasedOracle(pool, solver="swiglpk")
+
+    bads = SparseSet(range(len(pool.exclude)))
+    assert oracle._query(bads) == (False, None)
+    core, = oracle.found_cores
+    assert core != bads
+    assert plain._query(core)[0] is False
+    for i in core:
+        assert plain._query(core - i)[0] is True
+
+    n_calls = oracle.n_calls
+    assert oracle._query(core | (bads - core)[0]) == (False, None)
+    assert oracle.n_calls == n_calls
+
+    oracle.flush_system()
+    assert list(pool.system.iter_upper()) == [core]
+    assert oracle.n_cores == 1
+
+
+def test_lazy_include():
+    for incremental in (False, True):
+        pool = random_pool(n_include=40)
+        queries = random_queries(pool)
+
+        plain = LPbasedOracle(pool, solver="swiglpk")
+        lazy = LPbasedOracle(
+            pool, solver="swiglpk",
+            incremental=incremental, lazy_include=True,
+        )
+
+        res1 = [plain._query(q) for q in queries]
+        res2 = [lazy._query(q) for q in queries]
+        assert [ok for ok, _ in res1] == [ok for ok, _ in res2]
+        check_answers(pool, queries, res2)
+        assert len(lazy.include_rows) < len(pool.include)
+
+
+def test_native():
+    for is_upper in (False, True):
+        pool = random_pool(n_include=40)
+        if is_upper:
+            pool = ConstraintPool(
+                include=[p for p in product(range(2), repeat=6)
+                         if sum(p) >= 3],
+                exclude=[p for p in product(range(2), repeat=6)
+                         if sum(p) < 3],
+                constraint_class=Inequality,
+                is_upper=True,
+            )
+        queries = random_queries(pool)
+
+        plain = LPbasedOracle(pool, solver="swiglpk")
+        res1 = [plain._query(q) for q in queries]
+        for incremental in (False, True):
+            native = LPbasedOracle(
+                pool, solver="native", incremental=incremental,
+            )
+            res2 = [native._query(q) for q in queries]
+            assert [ok for ok, _ in res1] == [ok for ok, _ in res2]
+            check_answers(pool, queries, res2)
+            if is_upper:
+                for ok, ineq in res2:
+                    assert not ok or min(ineq[:-1]) >= 0
+
+
+def test_dominance():
+    rnd = random.Random(3)
+    pts = list(product(range(2), repeat=6))
+    mins = rnd.sample(pts, 5)
+    upper = [p for p in pts if any(min(p[i] - m[i] for i in range(6)) >= 0
+                                   for m in mins)]
+    for include in (upper, mins):
+        pool = ConstraintPool(
+            include=include,
+            exclude=[p for p in pts if p not in include],
+            constraint_class=Inequality,
+            is_upper=True,
+        )
+        queries = random_queries(pool)
+
+        plain = LPbasedOracle(pool, solver="swiglpk")
+        dom = LPbasedOracle(pool, solver="swiglpk", dominance=True)
+        res1 = [plain._query(q) for q in queries]
+        res2 = [dom._query(q) for q in queries]
+        assert [ok for ok, _ in res1] == [ok for ok, _ in res2]
+        check_answers(pool, queries, res2)
+
+        index = dom.dominance
+        assert index.n_feasible + index.n_infeasible \
+            == plain.n_calls - dom.n_calls > 0
+        if include is mins:
+            assert index.n_infeasible > 0
+        else:
+            assert index.n_feasible > 0 and not index.uncuttable.any()
+
+
+def test_verify():
+    pool = random_pool()
+    queries = random_queries(pool)
+
+    answers = []
+    for verify in LPbasedOracle.VERIFY_LEVELS:
+        oracle = LPbasedOracle(
+            pool, solver="swiglpk", verify=verify, verify_sample=5,
+        )
+        answers.append([oracle._query(q)[0] for q in queries])
+    assert answers[0] == answers[1] == answers[2]
+
+    oracle = LPbasedOracle(pool, solver="swiglpk", verify="full")
+    with pytest.raises(AssertionError):
+        oracle._verify(Inequality((0,) * pool.n + (-1,)))
+    with pytest.raises(ValueError):
+        LPbasedOracle(pool, verify="partial")
+
+    # the sample has distinct points
+    oracle = LPbasedOracle(pool, verify="sampled", verify_sample=29)
+    rows = []
+    oracle._include_values = lambda ineq, r: rows.append(r) or np.zeros(1)
+    oracle._verify(Inequality((0,) * pool.n + (0,)))
+    assert len(set(rows[0].tolist())) == 29
+
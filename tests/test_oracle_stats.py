@@ -0,0 +1,36 @@
+import json
+
+from optimodel.oracle_stats import OracleStats, log2_bucket, bucket_label
+
+
+def test_log2_bucket():
+    assert [log2_bucket(v) for v in (0, 0.5, 1, 2, 3, 4, 1000)] \
+        == [0, 0, 0, 1, 1, 2, 9]
+    # each value falls into its labelled range
+    for v in (0, 1, 2):
+        lo, hi = map(int, bucket_label(log2_bucket(v)).split("-"))
+        assert lo <= v <= hi
+    assert bucket_label(0, "ms") == "0-1ms"
+    assert bucket_label(1) == "2-3"
+
+
+def test_OracleStats():
+    stats = OracleStats()
+    stats.hit("cache")
+    stats.lp(size=1, is_feasible=True, build=0.001, solve=0.000010)
+    stats.lp(size=5, is_feasible=False, build=0.0, solve=0.5)
+
+    other = OracleStats()
+    other.lp(size=2, is_feasible=False, build=0.0, solve=0.000100)
+    stats.merge(other)
+
+    summary = json.loads(json.dumps(stats.summary()))
+    assert summary["queries"] == 4
+    assert summary["by_source"] == {"cache": 1, "lp": 3}
+    assert summary["lp"]["feasible"] == 1
+    assert summary["lp"]["infeasible"] == 2
+    assert summary["solve_time_us_hist"] == {
+        "8-15": 1, "64-127": 1, "262144-524287": 1,
+    }
+    assert summary["query_size_hist"] == {"0-1": 1, "2-3": 1, "4-7": 1}
+    assert summary["slowest"][0] == dict(solve_time=0.5, size=5, feasible=False)
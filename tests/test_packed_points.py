@@ -0,0 +1,122 @@
+from itertools import product
+
+import pytest
+from binteger import Bin
+from subsets import DenseSet
+
+from optimodel.packed_points import (
+    PackedPoints, denseset_codes, denseset_from_codes,
+)
+from optimodel.tool.base import complement_binary
+
+
+def test_PackedPoints_binary():
+    pts = {(1, 0, 1), (0, 0, 1), (1, 1, 1), (0, 0, 1)}
+    P = PackedPoints(pts)
+    assert P.n == 3
+    assert P.is_binary
+    assert len(P) == 3
+    assert list(P) == sorted(pts)
+    assert P[1] == (1, 0, 1)
+    assert P.codes.tolist() == [Bin(v).int for v in sorted(pts)]
+
+    assert P.index((1, 1, 1)) == 2
+    assert P.find((0, 1, 1)) == -1
+    assert P.find((0, 2, 1)) == -1
+    assert (1, 0, 1) in P
+    assert (1, 0, 0) not in P
+    assert P.indices([0b111, 0b000, 0b001]).tolist() == [2, -1, 0]
+
+    assert P.index_map[(1, 0, 1)] == 1
+    assert P.index_map.get((1, 1, 0)) is None
+    assert dict(P.index_map.items()) == {v: i for i, v in enumerate(P)}
+
+    Q = PackedPoints.from_codes([0b111, 0b001, 0b101], n=3)
+    assert list(Q) == list(P)
+
+
+def test_PackedPoints_reoriented():
+    pts = [v for v in product(range(2), repeat=4) if sum(v) % 3 == 1]
+    direction = (-1, 1, 1, -1)
+    P = PackedPoints(pts).reoriented(direction)
+    assert list(P) == sorted(
+        tuple(1 - v if d == -1 else v for v, d in zip(pt, direction))
+        for pt in pts
+    )
+    assert PackedPoints(pts).reoriented(None) is not None
+
+
+def test_PackedPoints_nonbinary():
+    pts = [(3, 0), (0, 2), (1, 1), (3, 0)]
+    P = PackedPoints(pts)
+    assert not P.is_binary
+    assert list(P) == sorted(set(pts))
+    assert P.index((1, 1)) == 1
+    assert P.find((1, 4)) == -1
+    assert P.unpack(P.codes).tolist() == [list(v) for v in P]
+
+
+def test_PackedPoints_negative():
+    pts = [(0, -1), (1, 1), (-1, 0), (3, -2), (0, -1)]
+    P = PackedPoints(pts)
+    assert P.offset == -2 and not P.is_binary
+    assert list(P) == sorted(set(pts))
+    assert P.index((3, -2)) == 3
+    assert P.find((-3, 0)) == -1
+    assert P.find((0, 2)) == -1
+    assert list(PackedPoints.from_sorted_matrix(P.matrix)) == list(P)
+    assert list(PackedPoints(P.matrix)) == list(P)
+    assert P.digest() != PackedPoints([(v + 2, w + 2) for v, w in pts]).digest()
+
+
+def test_PackedPoints_large_dimension():
+    n = 70
+    pts = [(1,) * n, (0,) * (n - 1) + (1,)]
+    P = PackedPoints(pts)
+    assert P.codes.dtype == object
+    assert list(P) == sorted(pts)
+    assert P.index((1,) * n) == 1
+
+
+def test_PackedPoints_cube_indices():
+    n = 6
+    codes = [x for x in range(2**n) if x % 3 != 1]
+    P = PackedPoints.from_codes(codes, n)
+    for u in (0, 0b000001, 0b101100, 0b111111, 0b010111):
+        for a in range(2**n):
+            if a & u:
+                continue
+            expected = [i for i, x in enumerate(codes) if x & ~u == a]
+            assert P.cube_indices(a, u).tolist() == expected
+
+
+def test_denseset_state():
+    # the bitmap is read from / written to DenseSet's pickling state;
+    # compare with the public API so that a layout change fails here
+    for n in (0, 1, 6, 7, 12):
+        codes = [x for x in range(2**n) if x % 7 in (1, 2, 6)]
+        d = DenseSet(n, codes)
+        assert denseset_codes(d).tolist() == list(d.get_support())
+        e = denseset_from_codes(codes, n)
+        assert e.n == n and len(e) == len(codes)
+        assert e.get_support() == tuple(codes)
+        assert e == d
+    with pytest.raises(ValueError):
+        denseset_from_codes([4], 2)
+
+
+def test_PackedPoints_DenseSet():
+    for n in (1, 3, 6, 7, 10):
+        codes = [x for x in range(2**n) if x % 5 in (0, 3)]
+        d = DenseSet(n, codes)
+        P = PackedPoints.from_DenseSet(d)
+        assert P.n == n
+        assert P.codes.tolist() == codes
+        assert P.to_DenseSet() == d
+
+        c = complement_binary(P)
+        assert c.get_support() == tuple(
+            x for x in range(2**n) if x % 5 not in (0, 3)
+        )
+        assert complement_binary(d) == c
+        assert complement_binary(list(P)) == c
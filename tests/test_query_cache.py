@@ -0,0 +1,85 @@
+from itertools import product
+
+from monolearn.SparseSet import SparseSet
+
+from optimodel.inequality import Inequality
+from optimodel.packed_points import PackedPoints
+from optimodel.query_cache import LRUDict, MonotoneQueryCache, CutPool
+
+
+def test_MonotoneQueryCache():
+    cache = MonotoneQueryCache(max_size=2)
+    assert cache.lookup(SparseSet((1, 2))) is None
+
+    cache.add(SparseSet((1, 2, 3)), True, "A")
+    cache.add(SparseSet((2, 5)), False)
+    assert len(cache) == 2
+
+    assert cache.lookup(SparseSet((1, 3))) == (True, "A")
+    assert cache.lookup(SparseSet((1, 2, 3))) == (True, "A")
+    assert cache.lookup(SparseSet((1, 4))) is None
+    assert cache.lookup(SparseSet((0, 2, 5, 7))) == (False, None)
+    assert cache.lookup(SparseSet((2, 7))) is None
+
+    cache.add(SparseSet((3, 4)), True, "B")
+    assert cache.lookup(SparseSet((4,))) == (True, "B")
+    assert cache.lookup(SparseSet((3,))) in ((True, "A"), (True, "B"))
+
+    # LRU: (3, 4) was used last, (1, 2, 3) is evicted
+    cache.lookup(SparseSet((4,)))
+    cache.add(SparseSet((6, 7)), True, "C")
+    assert len(cache.feasible) == 2
+    assert cache.lookup(SparseSet((1, 2))) is None
+    assert cache.lookup(SparseSet((3, 4))) == (True, "B")
+    assert cache.lookup(SparseSet((7,))) == (True, "C")
+
+    cache.add(SparseSet((0, 1)), False)
+    cache.lookup(SparseSet((0, 1, 2, 5)))
+    cache.add(SparseSet((8,)), False)
+    assert len(cache.infeasible) == 2
+    assert cache.lookup(SparseSet((1, 8))) == (False, None)
+    assert cache.lookup(SparseSet((0, 1, 3))) == (False, None)
+    assert cache.lookup(SparseSet((2, 5))) is None
+
+    assert cache.n_hits_feasible == 7
+    assert cache.n_hits_infeasible == 4
+    assert cache.n_misses == 5
+
+
+def test_CutPool():
+    exclude = PackedPoints(product(range(2), repeat=3))
+    cuts = CutPool(exclude, max_size=2)
+
+    # x0 + x1 + x2 >= 2 cuts 000, 001, 010, 100
+    ineq1 = Inequality((1, 1, 1, -2))
+    assert cuts.cut_set(ineq1) == SparseSet((0, 1, 2, 4))
+    cuts.add(ineq1)
+    assert cuts.lookup(SparseSet((1, 4))) == (True, ineq1)
+    assert cuts.lookup(SparseSet((1, 3))) is None
+
+    # x0 <= 0 cuts 100, 101, 110, 111
+    ineq2 = Inequality((-1, 0, 0, 0))
+    cuts.add(ineq2)
+    cuts.add(ineq2)
+    assert len(cuts) == 2
+    assert cuts.lookup(SparseSet((5, 7))) == (True, ineq2)
+    assert cuts.lookup(SparseSet((4,))) in ((True, ineq1), (True, ineq2))
+
+    cuts.lookup(SparseSet((5,)))
+    cuts.add(Inequality((0, 0, -1, 0)))
+    assert len(cuts) == 2
+    assert cuts.lookup(SparseSet((0,))) is None
+    assert cuts.lookup(SparseSet((7,))) is not None
+    assert (cuts.n_hits, cuts.n_misses) == (5, 2)
+
+
+def test_LRUDict():
+    d = LRUDict(3)
+    for i in range(3):
+        d[i] = -i
+    assert d[0] == 0  # refreshed
+    d[3] = -3
+    assert list(d) == [2, 0, 3]
+    d[2] = 2
+    d[4] = -4
+    assert list(d.items()) == [(3, -3), (2, 2), (4, -4)]
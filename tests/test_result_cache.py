@@ -0,0 +1,48 @@
+from optimodel.constraint_pool import ConstraintPool
+from optimodel.inequality import Inequality
+from optimodel.packed_points import PackedPoints
+from optimodel.result_cache import ResultCache
+
+
+def test_fingerprint():
+    exc = [(0, 0, 1), (1, 0, 0)]
+    inc = [(1, 1, 1), (0, 1, 1)]
+
+    assert PackedPoints(exc).digest() == \
+        PackedPoints.from_codes([0b100, 0b001], n=3).digest()
+    assert PackedPoints(exc).digest() != PackedPoints(inc).digest()
+
+    def fp(exc, inc, **kwargs):
+        pool = ConstraintPool(
+            exclude=exc, include=inc, constraint_class=Inequality, **kwargs,
+        )
+        return pool.fingerprint(kind="ineq")
+
+    assert fp(exc, inc) == fp(exc[::-1], set(inc))
+    assert fp(exc, inc) != fp(inc, exc)
+    assert fp(exc, inc) != fp(exc, inc, is_upper=True)
+
+
+def test_result_cache(tmp_path):
+    cache = ResultCache(str(tmp_path))
+    assert cache.lookup("f1") is None
+
+    sysfile = tmp_path / "system.bz2"
+    sysfile.write_bytes(b"system")
+
+    assert cache.store("f1", [(1, -2, 3), (0, 1, 0)], False, "A", str(sysfile))
+    res = cache.lookup("f1")
+    assert res.constraints == [(1, -2, 3), (0, 1, 0)]
+    assert not res.optimal
+    assert res.source == "A"
+    with open(res.sysfile, "rb") as f:
+        assert f.read() == b"system"
+
+    # not better
+    assert not cache.store("f1", [(1,), (2,), (3,)], True, "B")
+    assert not cache.store("f1", [(1,), (2,)], False, "B")
+    # better
+    assert cache.store("f1", [(1,), (2,)], True, "C")
+    assert cache.lookup("f1").source == "C"
+    assert cache.lookup("f1").constraints == [(1,), (2,)]
+    assert cache.lookup("f2") is None
@@ -0,0 +1,92 @@
+import bz2
+import os
+
+import pytest
+
+from subsets import DenseSet
+
+from optimodel.tool import set_files
+from optimodel.tool.set_files import read_set
+
+
+POINTS = [(1, 0, 1), (0, 0, 1), (1, 1, 1), (0, 0, 0)]
+
+
+def write_text(filename, points, n=3, opener=open):
+    with opener(filename, "wt") as f:
+        print(len(points), n, file=f)
+        for pt in points:
+            print(*pt, file=f)
+
+
+def test_read_set_formats(tmp_path, monkeypatch):
+    monkeypatch.setattr(set_files, "CHUNK_SIZE", 7)  # split lines
+
+    write_text(str(tmp_path / "a.txt"), POINTS)
+    write_text(str(tmp_path / "b.bz2"), POINTS, opener=bz2.open)
+    DenseSet(3, [0b101, 0b001, 0b111, 0b000]).save_to_file(
+        str(tmp_path / "c.set")
+    )
+
+    for name in ("a", "b", "c"):
+        pts = read_set(str(tmp_path / name))
+        assert pts.n == 3
+        assert list(pts) == sorted(POINTS)
+
+
+def test_read_set_nonbinary(tmp_path):
+    write_text(str(tmp_path / "a.txt"), [(3, 0, 300), (0, 2, 1)])
+    pts = read_set(str(tmp_path / "a.txt"))
+    assert list(pts) == [(0, 2, 1), (3, 0, 300)]
+
+    write_text(str(tmp_path / "b.txt"), [(-3, 0, 1), (0, -1, 1)])
+    pts = read_set(str(tmp_path / "b.txt"), cache=True)
+    assert list(pts) == [(-3, 0, 1), (0, -1, 1)]
+    assert list(read_set(str(tmp_path / "b.txt"), cache=True)) == list(pts)
+
+
+def test_read_set_malformed(tmp_path):
+    write_text(str(tmp_path / "a.txt"), POINTS, n=4)
+    with pytest.raises(ValueError):
+        read_set(str(tmp_path / "a.txt"))
+
+    write_text(str(tmp_path / "b.txt"), POINTS[:2])
+    with open(tmp_path / "b.txt", "r+") as f:
+        f.write("3")  # header claims more points
+    with pytest.raises(ValueError):
+        read_set(str(tmp_path / "b.txt"))
+
+
+def test_read_set_cache(tmp_path):
+    filename = str(tmp_path / "a.txt")
+    write_text(filename, POINTS)
+
+    pts = read_set(filename, cache=True)
+    assert os.path.isfile(filename + ".npy")
+
+    cached = read_set(filename, cache=True)
+    assert list(cached) == list(pts)
+    assert cached.codes.tolist() == pts.codes.tolist()
+    assert cached.find((1, 1, 1)) == 3
+
+    # outdated cache is not used
+    write_text(filename, POINTS[:2])
+    assert list(read_set(filename, cache=True)) == sorted(POINTS[:2])
+
+    # even if the source is rewritten with an older mtime
+    write_text(filename, POINTS)
+    stat = os.stat(filename + ".npy")
+    os.utime(filename, ns=(stat.st_atime_ns, stat.st_mtime_ns - 10**10))
+    assert list(read_set(filename, cache=True)) == sorted(POINTS)
+
+
+def test_parse_integers():
+    assert set_files.parse_integers(b"0 1 1\n1 0 0\n").tolist() == [0, 1, 1, 1, 0, 0]
+    assert set_files.parse_integers(b"0 1 12\n1 0 0\n").tolist() == [0, 1, 12, 1, 0, 0]
+    assert set_files.parse_integers(b"0  1\r\n").tolist() == [0, 1]
+    assert set_files.parse_integers(b"").tolist() == []
+    assert set_files.parse_integers(b"-1 20\n3").tolist() == [-1, 20, 3]
+    with pytest.raises(ValueError):
+        set_files.parse_integers(b"0 1 12\n1 x 0\n")
+    with pytest.raises(ValueError):
+        set_files.parse_integers(b"0 1 1.5\n")
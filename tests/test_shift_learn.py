@@ -0,0 +1,419 @@
+import os
+import time
+import pickle
+import random
+import multiprocessing
+from itertools import count, product
+
+import pytest
+from binteger import Bin
+
+from monolearn.SparseSet import SparseSet
+from monolearn.LowerSetLearn import LowerSetLearn
+
+from optimodel.constraint_pool import ConstraintPool
+from optimodel.inequality import Inequality
+from optimodel.shift_learn import ShiftLearn
+from optimodel.shift_journal import ShiftJournal
+from optimodel.shift_queue import ShiftQueue
+from optimodel.shift_merge import ShiftMerge
+
+pytest.importorskip("swiglpk")
+
+
+CHAIN = [
+    ("LevelLearn", (), dict(levels_lower=3)),
+    ("GainanovSAT", (), dict(sense="min")),
+]
+
+
+def shift_learn(path, n=4, n_include=7, seed=1, **kwargs):
+    rnd = random.Random(seed)
+    pts = list(product(range(2), repeat=n))
+    rnd.shuffle(pts)
+    pool = ConstraintPool(
+        include=pts[:n_include],
+        exclude=pts[n_include:],
+        constraint_class=Inequality,
+        sysfile=str(path / "system"),
+    )
+    return ShiftLearn(pool=pool, path=str(path), learn_chain=CHAIN, **kwargs)
+
+
+def composed(sl):
+    sl.compose()
+    system = sl.pool.system
+    return {vec: system.meta[vec] for vec in system.iter_lower()}
+
+
+@pytest.mark.parametrize("start_method", ["spawn", "forkserver"])
+def test_parallel(tmp_path, start_method):
+    (tmp_path / "seq").mkdir()
+    (tmp_path / "par").mkdir()
+    seq = shift_learn(tmp_path / "seq")
+    seq.process_all_shifts(threads=1)
+
+    par = shift_learn(
+        tmp_path / "par", chunk_size=2, start_method=start_method,
+    )
+    par.process_all_shifts(threads=2)
+
+    assert composed(par) == composed(seq)
+
+
+def test_start_method(tmp_path):
+    with pytest.raises(ValueError):
+        shift_learn(tmp_path, start_method="thread")
+
+
+def test_resume(tmp_path, monkeypatch):
+    (tmp_path / "ref").mkdir()
+    ref = shift_learn(tmp_path / "ref")
+    ref.process_all_shifts()
+
+    # interrupted after 3 subproblems
+    learn_subproblem = ShiftLearn.learn_subproblem
+    processed = []
+
+    def interrupted(self, origin, subproblem=None):
+        if len(processed) == 3:
+            raise KeyboardInterrupt
+        processed.append(origin)
+        return learn_subproblem(self, origin, subproblem)
+
+    monkeypatch.setattr(ShiftLearn, "learn_subproblem", interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        shift_learn(tmp_path).process_all_shifts()
+    monkeypatch.undo()
+
+    # cut the last record
+    journal = tmp_path / "journal"
+    journal.write_bytes(journal.read_bytes()[:-5])
+
+    done = []
+    with open(journal, "rb") as f:
+        pickle.load(f)  # header
+        with pytest.raises(pickle.UnpicklingError):
+            while True:
+                done.append(pickle.load(f)[0])
+    processed.clear()
+
+    def counted(self, origin, subproblem=None):
+        processed.append(origin)
+        return learn_subproblem(self, origin, subproblem)
+
+    monkeypatch.setattr(ShiftLearn, "learn_subproblem", counted)
+    sl = shift_learn(tmp_path)
+    sl.process_all_shifts()
+    assert processed and not set(processed) & set(done)
+    assert composed(sl) == composed(ref)
+
+    # everything journaled: nothing to process
+    processed.clear()
+    shift_learn(tmp_path).process_all_shifts()
+    assert not processed
+
+    # another instance: the journal is not used
+    journal = ShiftJournal(str(tmp_path / "journal"), fingerprint="other")
+    assert not list(journal.load())
+    journal.close()
+    assert (tmp_path / "journal.stale").exists()
+
+
+def test_journal_sync(tmp_path, monkeypatch):
+    synced = []
+    fsync = os.fsync
+    monkeypatch.setattr(os, "fsync", lambda fd: synced.append(fd) or fsync(fd))
+
+    filename = str(tmp_path / "journal")
+    journal = ShiftJournal(filename, fingerprint="f", sync_interval=3600)
+    assert not list(journal.load())
+    assert len(synced) == 1  # header
+    for i in range(10):
+        journal.append((i,), {}, {})
+    assert len(synced) == 1
+    journal.close()
+    assert len(synced) == 2
+
+    # records are flushed even if not synced
+    journal = ShiftJournal(filename, fingerprint="f", sync_interval=0)
+    assert [origin for origin, _, _ in journal.load()] == \
+        [(i,) for i in range(10)]
+    journal.append((10,), {}, {})
+    assert len(synced) == 3
+    journal.close()
+
+
+def test_dedupe(tmp_path, monkeypatch):
+    # include is invariant under xor by 1100: shifts come in equal pairs
+    rnd = random.Random(3)
+    classes = rnd.sample(list(product(range(2), repeat=3)), 4)
+    pts = list(product(range(2), repeat=4))
+    include = [pt for pt in pts if (pt[0] ^ pt[1], *pt[2:]) in classes]
+    exclude = [pt for pt in pts if pt not in include]
+
+    def run(path):
+        path.mkdir()
+        pool = ConstraintPool(
+            include=include,
+            exclude=exclude,
+            constraint_class=Inequality,
+            sysfile=str(path / "system"),
+        )
+        sl = ShiftLearn(pool=pool, path=str(path), learn_chain=CHAIN)
+        sl.process_all_shifts()
+        return sl
+
+    learn_subproblem = ShiftLearn.learn_subproblem
+    processed = []
+
+    def counted(self, origin, subproblem=None):
+        processed.append(origin)
+        return learn_subproblem(self, origin, subproblem)
+
+    monkeypatch.setattr(ShiftLearn, "learn_subproblem", counted)
+    sl = run(tmp_path / "dedupe")
+    assert len(processed) <= len(exclude) // 2
+
+    distinct = count()
+    monkeypatch.setattr(
+        ShiftLearn, "subproblem_fingerprint",
+        staticmethod(lambda good, bad: next(distinct)),
+    )
+    ref = run(tmp_path / "ref")
+    assert composed(sl) == composed(ref)
+
+
+def test_subproblem_once(tmp_path, monkeypatch):
+    # computed when grouping, reused when learning
+    origin_subproblem = ShiftLearn.origin_subproblem
+    computed = []
+
+    def counted(self, origin):
+        computed.append(origin)
+        return origin_subproblem(self, origin)
+
+    monkeypatch.setattr(ShiftLearn, "origin_subproblem", counted)
+    for distributed in (False, True):
+        path = tmp_path / str(distributed)
+        path.mkdir()
+        sl = shift_learn(path, distributed=distributed)
+        sl.process_all_shifts()
+        assert sorted(computed) == sorted(b.tuple for b in sl.exclude.to_Bins())
+        computed.clear()
+
+
+def test_budget(tmp_path):
+    (tmp_path / "ref").mkdir()
+    ref = shift_learn(tmp_path / "ref")
+    ref.process_all_shifts()
+
+    sl = shift_learn(tmp_path, time_budget=0)
+    shifts = [b.tuple for b in ref.exclude.to_Bins()]
+    groups, costs, subproblems = sl.group_shifts(shifts)
+    assert costs == sorted(costs, reverse=True)
+    assert len(subproblems) == len(groups)
+
+    sl.process_all_shifts()
+    assert len(sl.unfinished) == len(ref.exclude)
+    assert not composed(sl)
+
+    # continued from the saved partial systems
+    sl = shift_learn(tmp_path)
+    sl.process_all_shifts()
+    assert not sl.unfinished
+    assert composed(sl) == composed(ref)
+
+
+def distributed_helper(path):
+    shift_learn(path, distributed=True, wait=False).process_all_shifts()
+
+
+@pytest.mark.parametrize("threads", [1, 2])
+def test_distributed(tmp_path, threads):
+    (tmp_path / "ref").mkdir()
+    ref = shift_learn(tmp_path / "ref")
+    ref.process_all_shifts()
+
+    (tmp_path / "shared").mkdir()
+    context = multiprocessing.get_context("spawn")
+    helpers = [
+        context.Process(target=distributed_helper, args=(tmp_path / "shared",))
+        for _ in range(2)
+    ]
+    for proc in helpers:
+        proc.start()
+    sl = shift_learn(
+        tmp_path / "shared", distributed=True, poll_interval=0.1,
+        start_method="spawn",
+    )
+    sl.process_all_shifts(threads=threads)
+    for proc in helpers:
+        proc.join()
+        assert proc.exitcode == 0
+
+    assert composed(sl) == composed(ref)
+    assert not list((tmp_path / "shared").glob("queue_*/*.lease"))
+
+
+def test_lease(tmp_path):
+    q1 = ShiftQueue(str(tmp_path), lease_time=60)
+    q2 = ShiftQueue(str(tmp_path), lease_time=60)
+    q2.owner += "-2"
+    assert q1.claim("a")
+    assert not q2.claim("a")
+    assert q2.claim("b")
+
+    # q1 died: its lease expires
+    past = time.time() - 120
+    os.utime(tmp_path / "a.lease", (past, past))
+    assert q2.claim("a")
+    q2.complete("a", [1, 2])
+    assert q2.is_finished("a")
+    assert not q1.claim("a")
+    assert q1.load("a") == [1, 2]
+
+    q2.time_budget = 10
+    q2.give_up("b")
+    assert q2.is_finished("b")
+    assert not q1.is_finished("b")  # no budget: to be retried
+    assert q2.load("b") is None
+    assert q1.claim("b")
+    q1.complete("b", [3])
+    assert q2.is_finished("b")
+    assert not list(tmp_path.glob("*.lease"))
+    assert not list(tmp_path.glob("*.unfinished"))
+
+
+def test_lease_race(tmp_path, monkeypatch):
+    # a dead process' lease, two processes take it over at once
+    q1 = ShiftQueue(str(tmp_path), lease_time=60)
+    q2 = ShiftQueue(str(tmp_path), lease_time=60)
+    q2.owner += "-2"
+    lease = tmp_path / "a.lease"
+    lease.write_text("dead")
+    past = time.time() - 120
+    os.utime(lease, (past, past))
+
+    age = q2._age
+    raced = []
+
+    def racing(filename):
+        ret = age(filename)
+        if not raced:
+            # q2 saw the expired lease, then q1 takes it over first
+            raced.append(True)
+            assert q1.claim("a")
+        return ret
+
+    monkeypatch.setattr(q2, "_age", racing)
+    assert not q2.claim("a")
+    assert lease.read_text().split()[0] == q1.owner
+    assert not list(tmp_path.glob("*.stale"))
+
+
+def test_lease_lost(tmp_path, monkeypatch):
+    q1, q2, q3 = (ShiftQueue(str(tmp_path), lease_time=60) for _ in range(3))
+    q2.owner += "-2"
+    q3.owner += "-3"
+    lease = tmp_path / "a.lease"
+
+    # q1 stalled: its lease expires and q2 takes it over
+    assert q1.claim("a")
+    past = time.time() - 120
+    os.utime(lease, (past, past))
+    assert q2.claim("a")
+    q1.refresh()
+    assert q1.lost == {"a"}
+    assert not q1.complete("a", [1])
+    assert not q1.claim("a")
+    assert lease.read_text().split()[0] == q2.owner
+    assert not q3.claim("a")
+    assert q2.complete("a", [2])
+    assert q3.load("a") == [2]
+
+    # q2 takes over a lease refreshed meanwhile by q1,
+    # and q3 claims the key before q2 can put the lease back
+    assert q1.claim("b")
+    lease = tmp_path / "b.lease"
+    os.utime(lease, (past, past))
+    age = q2._age
+
+    def racing(filename):
+        if filename.endswith(".stale"):
+            assert q3.claim("b")
+            return 0
+        return age(filename)
+
+    monkeypatch.setattr(q2, "_age", racing)
+    assert not q2.claim("b")
+    assert lease.read_text().split()[0] == q3.owner
+    assert not q1.owns("b")
+    assert not q1.give_up("b")
+    assert q3.owns("b")
+    assert q3.complete("b", [3])
+    assert not list(tmp_path.glob("*.lease"))
+    assert not list(tmp_path.glob("*.stale"))
+
+
+def test_spill(tmp_path):
+    (tmp_path / "ref").mkdir()
+    ref = shift_learn(tmp_path / "ref")
+    ref.process_all_shifts()
+    assert ref.merger.n_promoted
+
+    sl = shift_learn(tmp_path, max_pending=1)
+    sl.process_all_shifts()
+    assert sl.merger.n_spilled
+    assert composed(sl) == composed(ref)
+    assert not list(tmp_path.glob("merge_*"))
+
+
+def test_merge_repartition(tmp_path):
+    # one shift per vector of a 2-element core, spilled after each shift
+    system = LowerSetLearn(n=16)
+    merger = ShiftMerge(system, tmp_path, max_pending=1)
+    merger.FANOUT = 2
+    vecs = [SparseSet([i]) for i in range(8)]
+    core = {vec: Bin(0b11, 4) for vec in vecs}
+    for _ in range(4):
+        for vec in vecs:
+            merger.add(core, {vec: ("ineq", vec)})
+            merger.spill()
+    # an incomplete vector
+    vec = SparseSet([9])
+    merger.add({vec: Bin(0b1, 4)}, {vec: None})
+    assert merger.n_promoted == 0
+    assert merger.n_spilled == 4 * 8
+
+    merger.finish()
+    assert merger.n_promoted == 8
+    assert not list(tmp_path.iterdir())
+
+
+def test_merge_dirs(tmp_path):
+    system = LowerSetLearn(n=16)
+    a = ShiftMerge(system, tmp_path)
+    b = ShiftMerge(system, tmp_path)
+    assert a.dir != b.dir
+    # a journaled run removes leftovers of interrupted runs
+    c = ShiftMerge(system, tmp_path, clean=True)
+    assert [p.name for p in tmp_path.iterdir()] == [os.path.basename(c.dir)]
+
+
+def test_distributed_budget(tmp_path):
+    (tmp_path / "ref").mkdir()
+    ref = shift_learn(tmp_path / "ref")
+    ref.process_all_shifts()
+
+    sl = shift_learn(tmp_path, distributed=True, time_budget=0)
+    sl.process_all_shifts()
+    assert len(sl.unfinished) == len(ref.exclude)
+    assert not composed(sl)
+
+    # a larger budget retries the given up subproblems
+    sl = shift_learn(tmp_path, distributed=True)
+    sl.process_all_shifts()
+    assert not sl.unfinished
+    assert composed(sl) == composed(ref)
+    assert not list(tmp_path.glob("queue_*/*.unfinished"))
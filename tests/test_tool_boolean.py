@@ -0,0 +1,121 @@
+import sys
+import random
+from types import SimpleNamespace
+from itertools import product
+
+import pytest
+
+from monolearn.LowerSetLearn import LowerSetLearn
+
+from optimodel.packed_points import PackedPoints
+from optimodel.tool.boolean import ToolBoolean, cube_constraint
+
+pytest.importorskip("swiglpk")
+
+
+def write_set(filename, points, n):
+    with open(filename, "w") as f:
+        print(len(points), n, file=f)
+        for pt in points:
+            print(*pt, file=f)
+
+
+@pytest.mark.parametrize("fmt", ["cnf", "dnf"])
+def test_explicit(tmp_path, monkeypatch, fmt):
+    # x0 = 1
+    pts = list(product(range(2), repeat=3))
+    write_set(tmp_path / "include.txt", [p for p in pts if p[0]], n=3)
+    write_set(tmp_path / "exclude.txt", [p for p in pts if not p[0]], n=3)
+    (tmp_path / "type").write_text("explicit binary\n")
+
+    monkeypatch.setattr(sys, "argv", [
+        "optimodel.boolean", f"--{fmt}",
+        str(tmp_path),
+    ])
+    ToolBoolean().main()
+    assert (tmp_path / f"{fmt}.1.opt").read_text().split() == ["1", "1"]
+
+
+@pytest.mark.parametrize("fmt", ["cnf", "dnf"])
+def test_result_cache(tmp_path, monkeypatch, caplog, fmt):
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+    monkeypatch.delenv("XDG_CACHE_HOME", raising=False)
+    monkeypatch.delenv("OPTIMODEL_CACHE", raising=False)
+    pts = list(product(range(2), repeat=3))
+    for name in ("a", "b", "c"):
+        folder = tmp_path / name
+        folder.mkdir()
+        write_set(folder / "include.txt", [p for p in pts if p[0]], n=3)
+        write_set(folder / "exclude.txt", [p for p in pts if not p[0]], n=3)
+        (folder / "type").write_text("explicit binary\n")
+
+    # off by default
+    monkeypatch.setattr(sys, "argv", [
+        "optimodel.boolean", f"--{fmt}", str(tmp_path / "a"),
+    ])
+    ToolBoolean().main()
+    assert not (tmp_path / "home").exists()
+
+    cache = tmp_path / "cache"
+    for name in ("b", "c"):
+        monkeypatch.setattr(sys, "argv", [
+            "optimodel.boolean", f"--{fmt}", "--result-cache", str(cache),
+            str(tmp_path / name),
+        ])
+        ToolBoolean().main()
+        assert (tmp_path / name / f"{fmt}.1.opt").read_text().split() == ["1", "1"]
+    assert len(list(cache.iterdir())) == 1
+    assert caplog.text.count(": hit") == 1
+
+
+@pytest.mark.parametrize("fmt", ["cnf", "dnf"])
+def test_max_cubes_workers(tmp_path, monkeypatch, fmt):
+    n = 8
+    rnd = random.Random(1)
+    pts = list(product(range(2), repeat=n))
+    rnd.shuffle(pts)
+    results = []
+    for workers in (1, 2):
+        folder = tmp_path / str(workers)
+        folder.mkdir()
+        write_set(folder / "include.txt", pts[:100], n=n)
+        write_set(folder / "exclude.txt", pts[100:], n=n)
+        (folder / "type").write_text("explicit binary\n")
+
+        monkeypatch.setattr(sys, "argv", [
+            "optimodel.boolean", f"--{fmt}", str(folder),
+            f"MaxCubes:workers={workers}", "SubsetMILP:",
+        ])
+        ToolBoolean().main()
+        (opt,) = folder.glob(f"{fmt}.*.opt")
+        # the system is over the points to cover
+        system = LowerSetLearn(n=len(pts) - 100 if fmt == "cnf" else 100)
+        system.load_from_file(str(folder / f"{fmt}.system.bz2"))
+        results.append((
+            opt.name, opt.read_text(), system._lower, system.meta,
+            system.is_complete_lower,
+        ))
+    assert results[0] == results[1]
+
+
+def test_max_cubes_workers_wide():
+    # codes of n > 64 are Python integers: serial fallback
+    n = 70
+    rnd = random.Random(1)
+    exclude = PackedPoints(
+        [tuple(rnd.randrange(2) for _ in range(n)) for _ in range(50)]
+    )
+    assert exclude.codes.dtype == object
+    tool = ToolBoolean()
+    tool.pool = SimpleNamespace(exclude=exclude)
+    cubes = [
+        (a & ~u, u) for a, u in (
+            (rnd.getrandbits(n), rnd.getrandbits(n) | rnd.getrandbits(n))
+            for _ in range(20)
+        )
+    ]
+    got = list(tool._cube_constraints_parallel(cubes, workers=2))
+    expected = [cube_constraint(a, u, n, exclude) for a, u in cubes]
+    assert [clause for clause, _ in got] == [c for c, _ in expected]
+    assert [inds.tolist() for _, inds in got] \
+        == [inds.tolist() for _, inds in expected]
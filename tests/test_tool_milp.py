@@ -0,0 +1,18 @@
+import pytest
+
+pytest.importorskip("optisolveapi")
+
+from optimodel.lp_oracle import LPbasedOracle, ParallelLPOracle
+from optimodel.tool.milp import ToolMILP, AutoSimple
+
+
+def test_auto_simple():
+    tool = ToolMILP()
+    tool.oracle = object.__new__(LPbasedOracle)
+    assert tool.auto_simple() == AutoSimple
+    assert AutoSimple[0] == "Learn:LevelLearn,levels_lower=3"
+
+    tool.oracle = object.__new__(ParallelLPOracle)
+    commands = tool.auto_simple()
+    assert commands[0] == "Learn:BatchLevelLearn,levels_lower=3"
+    assert commands[1:] == AutoSimple[1:]